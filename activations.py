@@ -0,0 +1,87 @@
+import numpy as np
+
+
+def _sigmoid(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _tanh(z):
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def _sin(z):
+    return np.sin(np.clip(5.0 * z, -60.0, 60.0))
+
+
+def _gauss(z):
+    z = np.clip(z, -3.4, 3.4)
+    return np.exp(-5.0 * z ** 2)
+
+
+def _relu(z):
+    return np.where(z > 0.0, z, 0.0)
+
+
+def _softplus(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 0.2 * np.log(1 + np.exp(z))
+
+
+def _identity(z):
+    return z
+
+
+def _clamped(z):
+    return np.clip(z, -1.0, 1.0)
+
+
+def _inv(z):
+    with np.errstate(divide='ignore'):
+        return np.where(z != 0.0, 1.0 / np.where(z != 0.0, z, 1.0), 0.0)
+
+
+def _log(z):
+    return np.log(np.maximum(z, 1e-7))
+
+
+def _exp(z):
+    return np.exp(np.clip(z, -60.0, 60.0))
+
+
+def _abs(z):
+    return np.abs(z)
+
+
+def _hat(z):
+    return np.maximum(0.0, 1 - np.abs(z))
+
+
+def _square(z):
+    return z ** 2
+
+
+def _cube(z):
+    return z ** 3
+
+
+#NumPy versions of neat's built-in activation functions (same clamping), usable without neat
+ACTIVATIONS = {
+    "sigmoid": _sigmoid,
+    "tanh": _tanh,
+    "sin": _sin,
+    "gauss": _gauss,
+    "relu": _relu,
+    "softplus": _softplus,
+    "identity": _identity,
+    "clamped": _clamped,
+    "inv": _inv,
+    "log": _log,
+    "exp": _exp,
+    "abs": _abs,
+    "hat": _hat,
+    "square": _square,
+    "cube": _cube,
+}
+
+ACTIVATION_NAMES = sorted(ACTIVATIONS)
@@ -1,228 +1,277 @@
+import argparse
 import pickle
 import time
 
 import neat
 import os
 import pygame
-import random
 
-from entities import Ground, Dino, Cactus, Bird
-from constants import WIDTH, HEIGHT, WHITE, BLACK
+from renderer import Renderer
+from checkpoints import Checkpointer, restore_checkpoint, latest_checkpoint
+from course import Course
+from model import MODEL_FILE, export_genome
+from observations import ObservationBuilder, PRESETS
+from difficulty import PRESETS as DIFFICULTIES
+from profiling import Profiler, ProfilingReporter
+from spectator import SpectatorReporter
+from evaluation import evaluate_genomes, Curriculum, EvaluationScheduler, ParallelGameEvaluator
+from pipeline import run_pipelined
+from constants import WIDTH, HEIGHT
 
 
 
 # Initialize Pygame
 pygame.init()
 
-FONT = pygame.font.Font(None, 36)
-
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, render_every=1, render_best=False, seed=None, workers=1, course=None,
+                 frame_skip=1, observations=None, spectate=False, episodes=1, tick_budget=None, top_k=None,
+                 curriculum=None, difficulty=None, pipeline=False):
+        #headless: never open a window, simulation only
+        #render_every: only draw every Nth generation (ignored when headless)
+        #render_best: only draw the dino with the highest fitness
+        #seed: seeds the per-generation courses (same courses for any number of workers)
+        #workers: evaluate genomes on a process pool (always headless)
+        #course: train every generation on this fixed course.Course instead of a new one each time
+        #frame_skip: networks decide every Nth frame and the action is repeated in between
+        #observations: observations.ObservationBuilder for the network inputs (sets num_inputs)
+        #spectate: train headless and replay each generation's best genome in a separate viewer process
+        #episodes, tick_budget, top_k, curriculum, difficulty: see evaluation.EvaluationScheduler
+        #pipeline: evaluate each generation while it is being speciated (headless, see pipeline.py)
+        self.observations = observations or ObservationBuilder()
+        self.workers = workers
+        self.frame_skip = frame_skip
+        #picks each generation's courses (same courses for any number of workers)
+        self.scheduler = EvaluationScheduler(seed, num_obstacles=2, course=course, episodes=episodes,
+                                             tick_budget=tick_budget, top_k=top_k, curriculum=curriculum,
+                                             difficulty=difficulty)
+        self.spectate = spectate
+        self.pipeline = pipeline
+        self.headless = headless or workers > 1 or spectate or pipeline
+        self.render_every = max(1, render_every)
+        self.render_best = render_best
+        self.screen = None
+        self.generation = 0
+        self.stats = None
+        self.evaluator = None
+        self.profiler = Profiler()
+
+        self.renderer = None
+        if not self.headless:
+            self.open_window()
+            self.renderer = Renderer(self.screen)
+
+        self.score = 0
+        self.game_active = True
+        self.clock = pygame.time.Clock()
+
+    def open_window(self):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Chrome Dino Game")
 
-        # Load images
-        self.ground_img, self.dino_run_1_img, self.dino_run_2_img, self.dino_duck_1_img, self.dino_duck_2_img, self.dino_dead_img, self.cactus_images, self.bird_image_1, self.bird_image_2 = self.load_images()
+    def should_render(self):
+        return not self.headless and self.generation % self.render_every == 0
 
-        self.ground = Ground(self.ground_img)
-        # self.dino = Dino(self.dino_run_1_img, self.dino_run_2_img, self.dino_duck_1_img, self.dino_duck_2_img, self.dino_dead_img)
+    def display_score(self, env, playing):
+        score = max(env.score[playing], default=0)
+        self.renderer.draw_text(f"Highest Score: {int(score)}", (10, 10))
 
-        # Start with obstacles: Cacti and Bird
-        self.obstacles = []
-        previous_obstacle = None
-        for _ in range(2):
-            if random.random() <= 0.7:
-                cactus = Cactus(self.cactus_images, previous_obstacle, self.obstacles)
-                self.obstacles.append(cactus)
-                previous_obstacle = cactus
-            else:
-                bird = Bird([self.bird_image_1, self.bird_image_2], previous_obstacle, self.obstacles)
-                self.obstacles.append(bird)
-                previous_obstacle = bird
+    def draw(self, env, dinos, playing):
+        self.renderer.draw_env(env, dinos)
 
-        self.score = 0
-        self.game_active = True
-        self.clock = pygame.time.Clock()
+        self.display_score(env, playing)
 
-    def load_images(self):
-        ground_image = pygame.image.load("assets/ground.png").convert_alpha()
-        dino_run_1 = pygame.image.load("assets/dino_run1.png").convert_alpha()
-        dino_run_2 = pygame.image.load("assets/dino_run2.png").convert_alpha()
-        dino_duck_1 = pygame.image.load("assets/dino_duck1.png").convert_alpha()
-        dino_duck_2 = pygame.image.load("assets/dino_duck2.png").convert_alpha()
-        dino_dead = pygame.image.load("assets/dino_dead.png").convert_alpha()
-
-        # Load cactus images
-        cactus_images = [
-            pygame.image.load("assets/cactus_small.png").convert_alpha(),
-            pygame.image.load("assets/cactus_big.png").convert_alpha(),
-            pygame.image.load("assets/cactus_small_many.png").convert_alpha()
-        ]
-
-        bird_image_1 = pygame.image.load("assets/bird_1.png").convert_alpha()
-        bird_image_2 = pygame.image.load("assets/bird_2.png").convert_alpha()
-
-        return ground_image, dino_run_1, dino_run_2, dino_duck_1, dino_duck_2, dino_dead, cactus_images, bird_image_1, bird_image_2
-
-
-    def display_score(self):
-        score = 0
-        for dino in self.dinos:
-            if dino.score > score:
-                score = dino.score
-        score_text = pygame.font.Font(None, 36).render(f"Highest Score: {int(score)}", True, BLACK)
-        self.screen.blit(score_text, (10, 10))
-
-
-    def update(self):
-        for dino in self.dinos:
-            if not dino.dead:
-                self.ground.move()
-                dino.move()
-
-                for obstacle in self.obstacles:
-                    obstacle.move()
-                    if obstacle.collides_with(dino):
-                        dino.die()
-
-                dino.increment_score()
-
-    def draw(self):
-        self.screen.fill(WHITE)
-        self.ground.draw(self.screen)
-        for dino in self.dinos:
-            if not dino.dead:
-                dino.draw(self.screen)
-
-        for obstacle in self.obstacles:
-            obstacle.draw(self.screen)
-
-        self.display_score()
-        pygame.display.update()
-
-
-    def get_game_state(self, dino):
-        # Return game state for NEAT AI to process
-        nearest_obstacle = None
-        for obstacle in self.obstacles:
-            if obstacle.rect.right > dino.rect.left:
-                nearest_obstacle = obstacle
-                break
-
-        if nearest_obstacle:
-            return (
-                dino.rect.bottom,  # Dino's Y position
-                nearest_obstacle.rect.left,  # Obstacle X position
-                nearest_obstacle.rect.bottom,  # Obstacle Y position
-                nearest_obstacle.rect.width,  # Obstacle width
-            )
-        return (dino.rect.bottom, WIDTH, HEIGHT, 0)  # No obstacle
+    def draw_frame(self, env, fitness, playing):
+        if self.render_best:
+            dinos = [max(playing, key=lambda j: fitness[j])]
+        else:
+            dinos = [i for i in playing if not env.dead[i]]
+        self.draw(env, dinos, playing)
+        self.draw_hud(fitness, playing)
+        self.renderer.present()
 
 
     def fitness_function(self, genomes, config):
-        nets = []
         ge = []
-        self.dinos = []
-        generation = 0
 
         for genome_id, genome in genomes:
-            genome.fitness = 0  #starting fitness at 0
-            net = neat.nn.FeedForwardNetwork.create(genome, config)
-            nets.append(net)
-            self.dinos.append(Dino(self.dino_run_1_img, self.dino_run_2_img, self.dino_duck_1_img, self.dino_duck_2_img, self.dino_dead_img))
             ge.append(genome)
 
-        run = True
-        while run:
-            self.update()
-            self.draw()
-
-            alive = len([dino for dino in self.dinos if not dino.dead])
-            dead = len([dino for dino in self.dinos if dino.dead])
-            max_fitness = max([genome.fitness for genome in ge])
-
-            gen_text = pygame.font.Font(None, 36).render(f"Generation: {generation}", True, BLACK)
-            alive_text = pygame.font.Font(None, 36).render(f"Alive: {alive}", True, BLACK)
-            dead_text = pygame.font.Font(None, 36).render(f"Dead: {dead}", True, BLACK)
-            fitness_text = pygame.font.Font(None, 36).render(f"Fitness: {max_fitness:.2f}", True, BLACK)
-
-            self.screen.blit(gen_text, (10, 50))
-            self.screen.blit(alive_text, (10, 90))
-            self.screen.blit(dead_text, (10, 130))
-            self.screen.blit(fitness_text, (10, 170))
-
-            pygame.display.update()
-
-            for i, dino in enumerate(self.dinos):
-                #incrementing fitness based on score
-                distance_traveled = dino.score
-                ge[i].fitness += 0.2 * distance_traveled  # fitness proportionally to distance
-
-                #Reward
-                if not dino.dead:
-                    ge[i].fitness += 1
-
-                #penalty
-                if dino.dead:
-                    death_penalty = max(50 - dino.score, 0)
-                    ge[i].fitness -= 2 + death_penalty * 0.1  #large penalty for early death
-                    self.dinos.pop(i)
-                    nets.pop(i)
-                    ge.pop(i)
-                    # continue
-                else:
-                    #retrieving game state for NEAT model and decide action
-                    game_state = self.get_game_state(dino)
-                    action = nets[i].activate(game_state)
-
-                    #model outputs
-                    if action[0] > 0.5:  # Jump
-                        dino.jump()
-                    elif action[1] > 0.5:  # Duck
-                        dino.duck(True)
-                    else:  #do nothing
-                        dino.duck(False)
-
-                    #reward
-                    if dino.score >= 50:
-                        ge[i].fitness += 50
-                    if dino.score >= 100:
-                        ge[i].fitness += 75
-                    if dino.score >= 200:
-                        ge[i].fitness += 100
-                        self.dinos.pop(i)
-                        nets.pop(i)
-                        ge.pop(i)
-
-            #all dinos are dead
-            if len(self.dinos) == 0:
-                run = False
-
-            # FPS
-            # self.clock.tick(60)
-
-        generation += 1
-
-
-    def run_neat(self, config_path):
-        config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                                    neat.DefaultSpeciesSet, neat.DefaultStagnation, config_path)
-        p = neat.Population(config)
+        #every dino of a generation gets its own world on the same course, stepped as arrays
+        on_frame = self.draw_frame if self.should_render() else None
+
+        def run_episode(indices, course):
+            return evaluate_genomes([ge[i] for i in indices], config, course, on_frame=on_frame,
+                                    frame_skip=self.frame_skip, observations=self.observations,
+                                    profiler=self.profiler, tick_budget=self.scheduler.tick_budget)
+
+        fitnesses = self.scheduler.evaluate(len(ge), run_episode, self.profiler)
+
+        for genome, fitness in zip(ge, fitnesses):
+            genome.fitness = fitness
+
+        self.generation += 1
+
+    def draw_hud(self, fitness, playing):
+        alive = len(playing)
+        dead = len(fitness) - alive
+        max_fitness = max(fitness)
+
+        self.renderer.draw_text(f"Generation: {self.generation}", (10, 50))
+        self.renderer.draw_text(f"Alive: {alive}", (10, 90))
+        self.renderer.draw_text(f"Dead: {dead}", (10, 130))
+        self.renderer.draw_text(f"Fitness: {max_fitness:.2f}", (10, 170))
+
+
+    def evaluated_course(self):
+        #the (first) course of the generation evaluated last
+        return self.scheduler.courses[0]
+
+    def checkpoint_state(self):
+        #everything besides the neat population a resumed run needs
+        scheduler = self.scheduler.state()
+        return {
+            #generations evaluated before the one a resumed run starts with, whichever
+            #evaluator ran them (self.generation only counts the ones this process drew)
+            "generation": scheduler["generation"],
+            "scheduler": scheduler,
+            "observations": self.observations,
+            "stats": self.stats,
+        }
+
+    def run_neat(self, config_path, generations=100, resume=None, checkpoint_dir="checkpoints", checkpoint_every=5,
+                 keep_checkpoints=3, profile=False, profile_log=None):
+        #resume: checkpoint file to continue from (its config and observations replace ours)
+        #profile: print where each generation's evaluation time went, profile_log: also log it (.csv or .jsonl)
+        state = None
+        if resume:
+            p, state = restore_checkpoint(resume)
+            self.generation = state["generation"]
+            self.observations = state["observations"]
+            self.stats = state["stats"]
+            print(f"Resuming from '{resume}' at generation {p.generation}")
+        else:
+            config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                        neat.DefaultSpeciesSet, neat.DefaultStagnation, config_path)
+            #network inputs come from the observation builder, not the config file
+            self.observations.configure(config)
+            p = neat.Population(config)
+            self.stats = neat.StatisticsReporter()
 
         p.add_reporter(neat.StdOutReporter(True))
-        stats = neat.StatisticsReporter()
-        p.add_reporter(stats)
-
-        winner = p.run(self.fitness_function, 100)  #NEAT algorithm for 50 generations
+        p.add_reporter(self.stats)
+        if profile or profile_log:
+            p.add_reporter(ProfilingReporter(self.profiler, profile_log, verbose=profile))
+        checkpointer = Checkpointer(checkpoint_dir, checkpoint_every, keep_checkpoints,
+                                    extra_state=self.checkpoint_state)
+        checkpointer.best_genome = p.best_genome
+        p.add_reporter(checkpointer)
+
+        if self.workers > 1:
+            self.evaluator = ParallelGameEvaluator(self.workers, self.scheduler, frame_skip=self.frame_skip,
+                                                   observations=self.observations, profiler=self.profiler)
+        spectator = None
+        if self.spectate:
+            spectator = SpectatorReporter(self.evaluated_course, self.observations, self.frame_skip,
+                                          self.scheduler.tick_budget)
+            p.add_reporter(spectator)
+        if state:
+            self.scheduler.restore(state["scheduler"])
+
+        try:
+            fitness_function = self.evaluator.evaluate if self.evaluator else self.fitness_function
+            #NEAT algorithm for the remaining generations
+            if self.pipeline:
+                winner = run_pipelined(p, fitness_function, generations - p.generation, self.scheduler.prepare)
+            else:
+                winner = p.run(fitness_function, generations - p.generation)
+        finally:
+            checkpointer.close()
+            if spectator:
+                spectator.close()
+            if self.evaluator:
+                self.evaluator.close()
 
         with open('best_model.pkl', 'wb') as f:
             pickle.dump(winner, f)
         print("Best genome saved to 'best_model.pkl'")
+        #what game.py loads: the compiled network and its observation layout, no pickle
+        export_genome(winner, p.config, MODEL_FILE, self.observations)
+        print(f"Model saved to '{MODEL_FILE}' (inputs: {', '.join(self.observations.names())})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the dino agent with NEAT.")
+    parser.add_argument("--headless", action="store_true",
+                        help="train without opening a window or drawing anything")
+    parser.add_argument("--render-every", type=int, default=1, metavar="N",
+                        help="only draw every Nth generation (default: every generation)")
+    parser.add_argument("--render-best", action="store_true",
+                        help="only draw the dino with the highest fitness")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the obstacle courses, makes fitness reproducible")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes evaluating genomes (more than 1 implies --headless)")
+    parser.add_argument("--course", default=None, metavar="PATH",
+                        help="train every generation on this saved course (see course.py)")
+    parser.add_argument("--observation", choices=sorted(PRESETS), default="raw",
+                        help="network inputs: raw = the 4 original values, rich = normalized features of the next 2 obstacles")
+    parser.add_argument("--frame-skip", type=int, default=1, metavar="N",
+                        help="let the networks decide every Nth frame and repeat the action in between")
+    parser.add_argument("--episodes", type=int, default=1, metavar="N",
+                        help="courses per generation, fitness is the mean over them (default: 1)")
+    parser.add_argument("--tick-budget", type=int, default=None, metavar="N",
+                        help="stop a dino after N frames of an episode (default: only at score 200)")
+    parser.add_argument("--top-k", type=int, default=None, metavar="K",
+                        help="with --episodes, stop evaluating genomes that can no longer reach the top K")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTIES), default="classic",
+                        help="speed ramp and obstacle settings of the training courses (see difficulty.py)")
+    parser.add_argument("--curriculum", type=int, default=None, metavar="N",
+                        help="raise the starting speed and obstacle density every N generations")
+    parser.add_argument("--spectate", action="store_true",
+                        help="train headless and watch each generation's best genome replayed in its own window")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="start evaluating each generation while it is being speciated (implies --headless)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-generation phase timings and throughput")
+    parser.add_argument("--profile-log", default=None, metavar="PATH",
+                        help="append per-generation profiling records to PATH (.csv, or .jsonl for JSON lines)")
+    parser.add_argument("--generations", type=int, default=100,
+                        help="total number of generations (a resumed run counts the ones already done)")
+    parser.add_argument("--resume", default=None, metavar="PATH",
+                        help="continue from a checkpoint file, or the newest checkpoint in a directory")
+    parser.add_argument("--checkpoint-dir", default="checkpoints",
+                        help="where checkpoints are written (default: checkpoints)")
+    parser.add_argument("--checkpoint-every", type=int, default=5, metavar="N",
+                        help="save a checkpoint every N generations (default: 5)")
+    parser.add_argument("--keep-checkpoints", type=int, default=3, metavar="N",
+                        help="only keep the newest N checkpoints (default: 3)")
+    args = parser.parse_args()
+    if args.keep_checkpoints < 1:
+        parser.error("--keep-checkpoints must be at least 1")
+    #genomes are only culled between episodes
+    if args.top_k and (args.episodes < 2 or args.course):
+        parser.error("--top-k needs --episodes 2 or more (and no fixed --course)")
+    return args
 
 
 if __name__ == "__main__":
+    args = parse_args()
     local_dir = os.path.dirname(__file__)
     config_path = os.path.join(local_dir, "config-feedforward.txt")
-    game = Game()
-    game.run_neat(config_path)
+    course = Course.load(args.course) if args.course else None
+    game = Game(headless=args.headless, render_every=args.render_every, render_best=args.render_best,
+                seed=args.seed, workers=args.workers, course=course, frame_skip=args.frame_skip,
+                observations=PRESETS[args.observation], spectate=args.spectate, episodes=args.episodes,
+                tick_budget=args.tick_budget, top_k=args.top_k,
+                curriculum=Curriculum(args.curriculum) if args.curriculum else None,
+                difficulty=DIFFICULTIES[args.difficulty], pipeline=args.pipeline)
+    resume = args.resume
+    if resume and os.path.isdir(resume):
+        resume = latest_checkpoint(resume)
+        if resume is None:
+            raise SystemExit(f"No checkpoints in '{args.resume}'")
+    game.run_neat(config_path, generations=args.generations, resume=resume, checkpoint_dir=args.checkpoint_dir,
+                  checkpoint_every=args.checkpoint_every, keep_checkpoints=args.keep_checkpoints,
+                  profile=args.profile, profile_log=args.profile_log)
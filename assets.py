@@ -0,0 +1,59 @@
+import os
+import struct
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+SPRITE_FILES = {
+    "ground": "ground.png",
+    "dino_run_1": "dino_run1.png",
+    "dino_run_2": "dino_run2.png",
+    "dino_duck_1": "dino_duck1.png",
+    "dino_duck_2": "dino_duck2.png",
+    "dino_dead": "dino_dead.png",
+    "cactus_small": "cactus_small.png",
+    "cactus_big": "cactus_big.png",
+    "cactus_small_many": "cactus_small_many.png",
+    "bird_1": "bird_1.png",
+    "bird_2": "bird_2.png",
+}
+
+#(pose, frame) -> sprite name, see Dino.pose()/Dino.frame()
+DINO_SPRITES = {
+    ("run", 0): "dino_run_1",
+    ("run", 1): "dino_run_2",
+    ("duck", 0): "dino_duck_1",
+    ("duck", 1): "dino_duck_2",
+    ("dead", 0): "dino_dead",
+    ("dead", 1): "dino_dead",
+}
+
+#variant order used by Cactus/Bird (index into these tuples)
+CACTUS_SPRITES = ("cactus_small", "cactus_big", "cactus_small_many")
+BIRD_SPRITES = ("bird_1", "bird_2")
+#obstacle type -> its sprites, see Obstacle.sprite()
+OBSTACLE_SPRITES = {
+    "cactus": CACTUS_SPRITES,
+    "bird": BIRD_SPRITES,
+}
+
+
+def asset_path(name):
+    return os.path.join(ASSETS_DIR, SPRITE_FILES[name])
+
+
+def read_png_size(path):
+    """Read (width, height) from the PNG IHDR chunk without decoding the image."""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    if header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+        raise ValueError(f"{path} is not a PNG file")
+    return struct.unpack(">II", header[16:24])
+
+
+#hitbox sizes, read once from the sprite metadata
+SPRITE_SIZES = {name: read_png_size(asset_path(name)) for name in SPRITE_FILES}
+
+DINO_SIZE = SPRITE_SIZES["dino_run_1"]
+GROUND_SIZE = SPRITE_SIZES["ground"]
+CACTUS_SIZES = [SPRITE_SIZES[name] for name in CACTUS_SPRITES]
+BIRD_SIZES = [SPRITE_SIZES[name] for name in BIRD_SPRITES]
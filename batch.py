@@ -0,0 +1,146 @@
+import numpy as np
+
+from assets import DINO_SIZE
+from collision import MAX_DINO_WIDTH, dino_sprite_index, masks_overlap
+from constants import GROUND_HEIGHT, DINO_OFFSET, RUN_ANIMATION_TIME
+from simulation import NOTHING, JUMP, DUCK
+
+DINO_X = 100 - DINO_SIZE[0] // 2  #every dino runs at the same x, see Dino.__init__
+STANDING_BOTTOM = GROUND_HEIGHT - DINO_OFFSET
+DUCKING_BOTTOM = GROUND_HEIGHT + 20
+
+
+def outputs_to_actions(outputs):
+    """Vectorized simulation.output_to_action for an (n, 3) array of network outputs."""
+    actions = np.full(len(outputs), NOTHING, dtype=np.int8)
+    duck = outputs[:, 1] > 0.5
+    jump = outputs[:, 0] > 0.5
+    actions[duck] = DUCK
+    actions[jump] = JUMP
+    return actions
+
+
+def round_half_away(values):
+    """Vectorized entities.to_int (pygame.Rect rounding)."""
+    return np.where(values >= 0, np.floor(values + 0.5), -np.floor(-values + 0.5))
+
+
+class DinoArrays:
+    """Dino state (Dino's attributes) as NumPy arrays, with Dino's physics as array operations."""
+
+    def reset_dinos(self, num_dinos):
+        """Replace the current dinos with num_dinos fresh ones."""
+        self.num_dinos = num_dinos
+        self.width, self.height = DINO_SIZE
+        self.y = np.full(num_dinos, STANDING_BOTTOM - self.height, dtype=np.float64)
+        self.velocity = np.zeros(num_dinos)
+        self.gravity = np.ones(num_dinos)
+        self.ducking = np.zeros(num_dinos, dtype=bool)
+        self.dead = np.zeros(num_dinos, dtype=bool)
+        #obstacle slot each dead dino ran into (-1 while alive)
+        self.killed_by = np.full(num_dinos, -1, dtype=np.int64)
+        #active: still being simulated (not dead and not removed from play)
+        self.active = np.ones(num_dinos, dtype=bool)
+        self.run_time = np.zeros(num_dinos, dtype=np.int64)
+        self.score = np.zeros(num_dinos)
+        #(dino, obstacle) pairs the last collide() got past its broad phase
+        self.collision_checks = 0
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    def jump(self, mask):
+        """Same as Dino.jump for every dino selected by mask."""
+        mask = mask & self.active & (self.bottom >= STANDING_BOTTOM)
+        self.velocity[mask] = -20
+        self.gravity[mask] = 0.8
+
+    def duck(self, mask, ducking=True):
+        self.ducking[mask & self.active] = ducking
+
+    def remove(self, mask):
+        """Take dinos out of play without killing them (e.g. they finished the course)."""
+        self.active[mask] = False
+
+    def apply_actions(self, actions):
+        """World.apply_action for every dino: actions is an array with one action per dino."""
+        self.jump(actions == JUMP)
+        self.duck(actions == DUCK)
+        self.duck(actions == NOTHING, False)
+
+    def move_dinos(self, alive):
+        """Dino.move for the dinos selected by alive."""
+        self.velocity[alive] += self.gravity[alive]
+        self.y[alive] = round_half_away(self.y[alive] + self.velocity[alive])
+        landed = alive & (self.y + self.height >= STANDING_BOTTOM)
+        self.y[landed] = STANDING_BOTTOM - self.height
+
+    def collide(self, alive, boxes, duckable, sprites=None, masked=None):
+        """Kill every alive dino that overlaps an obstacle (Obstacle.collides_with rules).
+
+        boxes is (1, K, 4) for obstacles shared by all dinos or (num_dinos, K, 4)
+        for one set per dino, holding x, y, width, height; duckable has the
+        matching shape without the last axis and marks birds at mid height.
+        With sprites (each obstacle's collision.OBSTACLE_MASK_SPRITES index,
+        shaped like duckable), the dinos selected by masked collide by pixel
+        masks instead of boxes.
+        Returns the mask of dinos that died; killed_by records which obstacle,
+        and collision_checks how many pairs reached the narrow phase.
+        """
+        hit = np.zeros(self.num_dinos, dtype=bool)
+        self.collision_checks = 0
+        #broad phase: every dino runs at DINO_X, so only obstacles in that x-band can touch one
+        band = MAX_DINO_WIDTH if sprites is not None else self.width
+        near = (DINO_X < boxes[..., 0] + boxes[..., 2]) & (boxes[..., 0] < DINO_X + band)
+        if not near.any():
+            return hit
+        rows, slots = np.nonzero(alive[:, None] & near)
+        self.collision_checks = len(rows)
+        if not len(rows):
+            return hit
+        shared = rows if len(boxes) > 1 else np.zeros_like(rows)
+        x, y, width, height = boxes[shared, slots].T
+
+        #narrow phase, only for those (dino, obstacle) pairs
+        dino_y = self.y[rows]
+        touching = ((DINO_X < x + width) & (x < DINO_X + self.width)
+                    & (dino_y < y + height) & (y < dino_y + self.height))
+        if sprites is not None:
+            by_mask = masked[rows]
+            mask_rows = rows[by_mask]
+            #the sprite Dino.sprite() would show now
+            ducked = self.ducking[mask_rows] & (self.y[mask_rows] + self.height == DUCKING_BOTTOM)
+            frame = self.run_time[mask_rows] // RUN_ANIMATION_TIME % 2
+            touching[by_mask] = masks_overlap(dino_sprite_index(ducked, frame), DINO_X, dino_y[by_mask],
+                                              sprites[shared[by_mask], slots[by_mask]], x[by_mask], y[by_mask])
+        hits = touching & ~(duckable[shared, slots] & self.ducking[rows])
+        if hits.any():
+            hit[rows[hits]] = True
+            #pairs come in dino then slot order: the first one of each dino is its lowest slot
+            dinos, first = np.unique(rows[hits], return_index=True)
+            self.killed_by[dinos] = slots[hits][first]
+        self.dead |= hit
+        self.active &= ~hit
+        return hit
+
+    def animate_dinos(self, animating):
+        """Dino.animate for the dinos selected by animating."""
+        lowered = animating & self.ducking & (self.y + self.height == STANDING_BOTTOM)
+        self.y[lowered] = DUCKING_BOTTOM - self.height
+        self.run_time[animating] += 1
+
+    def pose(self, i):
+        """Dino.pose for dino i."""
+        if self.dead[i]:
+            return "dead"
+        elif self.ducking[i] and self.y[i] + self.height == DUCKING_BOTTOM:
+            return "duck"
+        return "run"
+
+    def frame(self, i):
+        return int(self.run_time[i] // RUN_ANIMATION_TIME % 2)
+
+    def topleft(self, i):
+        return DINO_X, int(self.y[i])
+
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import neat
+import numpy as np
+
+from assets import DINO_SIZE, CACTUS_SIZES
+from course import Course
+from entities import Dino, Cactus
+from env import DinoEnv
+from evaluation import evaluate_genomes
+from inference import BatchNetwork
+from model import CompiledNetwork
+from simulation import World, JUMP, NOTHING
+
+BENCHMARK_FORMAT_VERSION = 1
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config-feedforward.txt")
+
+
+def load_config(num_hidden=None):
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation, CONFIG_PATH)
+    if num_hidden is not None:
+        config.genome_config.num_hidden = num_hidden
+    return config
+
+
+def make_genomes(config, count, seed=0):
+    """count new genomes, the same for a given seed."""
+    random.seed(seed)
+    genomes = []
+    for key in range(count):
+        genome = config.genome_type(key)
+        genome.configure_new(config.genome_config)
+        genomes.append(genome)
+    return genomes
+
+
+def timed(function, repeat):
+    """Best wall time of `repeat` calls of function()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_entities(scale, repeat):
+    """The object simulation: Dino.move, Obstacle.move and collision checks, alone and via World.update."""
+    calls = 20000 * scale
+    dino = Dino(DINO_SIZE)
+    cactus = Cactus(CACTUS_SIZES, 0, 400)
+
+    def move_dino():
+        for i in range(calls):
+            if i % 30 == 0:
+                dino.jump()
+            dino.move()
+
+    def move_cactus():
+        for _ in range(calls):
+            cactus.move()
+
+    results = {
+        "dino_moves_per_second": calls / timed(move_dino, repeat),
+        "obstacle_moves_per_second": calls / timed(move_cactus, repeat),
+        "collision_checks_per_second": calls / timed(lambda: [cactus.collides_with(dino) for _ in range(calls)],
+                                                     repeat),
+    }
+
+    num_dinos, frames = 50, 200 * scale
+
+    def run_world():
+        world = World(num_obstacles=3, course=Course(1, 3))
+        dinos = [world.add_dino() for _ in range(num_dinos)]
+        for frame in range(frames):
+            #revive everyone so every frame does the full work
+            for dino in dinos:
+                dino.dead = False
+                if frame % 30 == 0:
+                    dino.jump()
+            world.update()
+
+    seconds = timed(run_world, repeat)
+    results["world_frames_per_second"] = frames / seconds
+    results["world_dino_steps_per_second"] = frames * num_dinos / seconds
+    return results
+
+
+def bench_env(scale, repeat):
+    """DinoEnv.step for many worlds at once."""
+    num_worlds, frames = 1000, 100 * scale
+    actions = np.where(np.arange(num_worlds) % 3 == 0, JUMP, NOTHING)
+
+    def run():
+        env = DinoEnv(num_worlds, seed=1)
+        for _ in range(frames):
+            env.step(actions)
+            #revive everyone so every frame does the full work
+            env.dead[:] = False
+            env.active[:] = True
+
+    seconds = timed(run, repeat)
+    return {
+        "ticks_per_second": frames / seconds,
+        "dino_steps_per_second": frames * num_worlds / seconds,
+    }
+
+
+def bench_observation(scale, repeat):
+    """Building the network inputs (what get_game_state used to do) for every world."""
+    num_worlds, calls = 1000, 200 * scale
+    env = DinoEnv(num_worlds, seed=1)
+    for _ in range(50):
+        env.step(np.zeros(num_worlds, dtype=np.int8))
+
+    seconds = timed(lambda: [env.observation() for _ in range(calls)], repeat)
+    return {
+        "calls_per_second": calls / seconds,
+        "observations_per_second": calls * num_worlds / seconds,
+    }
+
+
+def bench_inference(scale, repeat):
+    """Network activations per second for a batch and for a single compiled network, by hidden nodes."""
+    results = {}
+    calls = 100 * scale
+    for num_hidden in (1, 8, 32):
+        config = load_config(num_hidden=num_hidden)
+        genomes = make_genomes(config, 200)
+        networks = BatchNetwork.create(genomes, config)
+        inputs = np.random.RandomState(0).uniform(0, 700, (len(genomes), networks.num_inputs))
+
+        seconds = timed(lambda: [networks.activate(inputs) for _ in range(calls)], repeat)
+        results[f"batch_h{num_hidden}_activations_per_second"] = calls * len(genomes) / seconds
+
+        single = CompiledNetwork.from_batch(BatchNetwork.create(genomes[:1], config))
+        seconds = timed(lambda: [single.activate(inputs[0]) for _ in range(calls)], repeat)
+        results[f"single_h{num_hidden}_activations_per_second"] = calls / seconds
+    return results
+
+
+def bench_generation(scale, repeat):
+    """Wall time of one headless generation (evaluate_genomes) by population size."""
+    results = {}
+    for pop_size in (50, 200, 1000):
+        config = load_config()
+        genomes = make_genomes(config, pop_size)
+        course = Course(7, 2)
+        seconds = timed(lambda: evaluate_genomes(genomes, config, course), repeat)
+        results[f"pop{pop_size}_seconds"] = seconds
+        results[f"pop{pop_size}_genomes_per_second"] = pop_size / seconds
+    return results
+
+
+BENCHMARKS = {
+    "entities": bench_entities,
+    "env": bench_env,
+    "observation": bench_observation,
+    "inference": bench_inference,
+    "generation": bench_generation,
+}
+
+
+def run_benchmarks(names, scale=1, repeat=3):
+    results = {}
+    for name in names:
+        print(f"{name}...", file=sys.stderr)
+        results[name] = {metric: round(value, 6) for metric, value in BENCHMARKS[name](scale, repeat).items()}
+    return {
+        "version": BENCHMARK_FORMAT_VERSION,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "scale": scale,
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Lines comparing report with baseline, and whether any metric got worse than tolerance.
+
+    Metrics ending in _seconds are better when lower, all others when higher.
+    """
+    lines = []
+    regressed = False
+    for name, metrics in report["results"].items():
+        for metric, value in metrics.items():
+            old = baseline.get("results", {}).get(name, {}).get(metric)
+            if not old:
+                continue
+            #positive change: faster
+            change = old / value - 1 if metric.endswith("_seconds") else value / old - 1
+            worse = change < -tolerance
+            regressed |= worse
+            flag = "REGRESSION" if worse else ""
+            lines.append(f"{name}.{metric}: {old:.6g} -> {value:.6g} ({change:+.1%}) {flag}".rstrip())
+    return lines, regressed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark simulation, inference and generation throughput.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--output", default=None, metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", default=None, metavar="PATH",
+                        help="compare with an earlier --output file; exits with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed slowdown against the baseline (default: 0.1 = 10%%)")
+    parser.add_argument("--scale", type=int, default=1, help="multiply the work per benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best is kept")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmarks(args.benchmarks or list(BENCHMARKS), args.scale, args.repeat)
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(report, baseline, args.tolerance)
+        print("\n".join(lines))
+        if regressed:
+            sys.exit(1)
@@ -0,0 +1,135 @@
+import copy
+import gzip
+import itertools
+import os
+import pickle
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import neat
+
+CHECKPOINT_FORMAT_VERSION = 1
+CHECKPOINT_PATTERN = re.compile(r"checkpoint-(\d+)\.pkl\.gz$")
+
+
+def checkpoint_path(directory, generation):
+    return os.path.join(directory, f"checkpoint-{generation:05d}.pkl.gz")
+
+
+def list_checkpoints(directory):
+    """Checkpoint files in directory, oldest generation first."""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = CHECKPOINT_PATTERN.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return [path for generation, path in sorted(found)]
+
+
+def latest_checkpoint(directory):
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1] if checkpoints else None
+
+
+class Checkpointer(neat.reporting.BaseReporter):
+    """neat reporter that saves the whole run every generation_interval generations.
+
+    A checkpoint holds the population, species, best genome, config, the
+    `random` module state and whatever extra_state() returns (course RNG,
+    statistics...). The state is pickled when the generation ends, so it is a
+    consistent snapshot; compressing and writing it happens on a background
+    thread while the next generation is evaluated. Files are replaced
+    atomically and only the newest `keep` are kept.
+    """
+
+    def __init__(self, directory="checkpoints", generation_interval=5, keep=3, extra_state=None):
+        if keep < 1:
+            #a run always keeps its newest checkpoint (and list[:-0] would keep them all)
+            raise ValueError(f"keep must be at least 1, not {keep}")
+        self.directory = directory
+        self.generation_interval = generation_interval
+        self.keep = keep
+        self.extra_state = extra_state
+        self.current_generation = None
+        self.best_genome = None
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = []
+
+    def start_generation(self, generation):
+        self.current_generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        if self.best_genome is None or best_genome.fitness > self.best_genome.fitness:
+            self.best_genome = best_genome
+
+    def end_generation(self, config, population, species_set):
+        #population is already the next generation, which is what a resumed run starts from
+        generation = self.current_generation + 1
+        if generation % self.generation_interval == 0:
+            self.save(config, population, species_set, generation)
+
+    def save(self, config, population, species_set, generation):
+        #the species set points at the live reporters (this one included), which are not saved
+        species_set = copy.copy(species_set)
+        species_set.reporters = None
+        data = {
+            "version": CHECKPOINT_FORMAT_VERSION,
+            "generation": generation,
+            "config": config,
+            "population": population,
+            "species_set": species_set,
+            "best_genome": self.best_genome,
+            "random_state": random.getstate(),
+            "extra": self.extra_state() if self.extra_state else None,
+        }
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.check_writes()
+        self.pending.append(self.executor.submit(self.write, payload, checkpoint_path(self.directory, generation)))
+
+    def write(self, payload, path):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(payload, compresslevel=5))
+        os.replace(tmp_path, path)
+
+        for old_path in list_checkpoints(self.directory)[:-self.keep]:
+            os.remove(old_path)
+
+    def check_writes(self):
+        """Re-raise the error of a failed background write, if any."""
+        for future in [future for future in self.pending if future.done()]:
+            self.pending.remove(future)
+            future.result()
+
+    def close(self):
+        """Wait for every checkpoint still being written."""
+        for future in self.pending:
+            future.result()
+        self.pending = []
+        self.executor.shutdown()
+
+
+def restore_checkpoint(path):
+    """Load a checkpoint into a neat.Population ready to run the next generation.
+
+    Also restores the `random` module state. Returns (population, extra) where
+    extra is what the Checkpointer's extra_state() returned.
+    """
+    with open(path, 'rb') as f:
+        data = pickle.loads(gzip.decompress(f.read()))
+    if data.get("version") != CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint format version {data.get('version')!r}")
+
+    random.setstate(data["random_state"])
+    population = neat.Population(data["config"], (data["population"], data["species_set"], data["generation"]))
+    population.species.reporters = population.reporters
+    #new genomes must not reuse the keys of the saved ones
+    population.reproduction.genome_indexer = itertools.count(max(data["population"]) + 1)
+    population.best_genome = data["best_genome"]
+    return population, data["extra"]
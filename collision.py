@@ -0,0 +1,156 @@
+import struct
+import zlib
+
+import numpy as np
+
+from assets import asset_path, SPRITE_SIZES, DINO_SPRITES, CACTUS_SPRITES, BIRD_SPRITES
+from constants import CACTUS, BIRD
+
+#a pixel is solid when its alpha is above this (pygame.mask.from_surface's default)
+ALPHA_THRESHOLD = 127
+
+#sprites a live dino can show (Dino.pose() is never "dead" while it can collide),
+#indexed by 2 * ducking + animation frame
+DINO_MASK_SPRITES = tuple(DINO_SPRITES[(pose, frame)] for pose in ("run", "duck") for frame in (0, 1))
+#every obstacle sprite; an obstacle's index is OBSTACLE_SPRITE_BASE[obstacle type] + variant
+OBSTACLE_MASK_SPRITES = CACTUS_SPRITES + BIRD_SPRITES
+OBSTACLE_SPRITE_BASE = np.zeros(2, dtype=np.int64)
+OBSTACLE_SPRITE_BASE[CACTUS] = 0
+OBSTACLE_SPRITE_BASE[BIRD] = len(CACTUS_SPRITES)
+
+#widest and tallest sprites, which bound where a dino can touch an obstacle
+MAX_DINO_WIDTH = max(SPRITE_SIZES[name][0] for name in DINO_MASK_SPRITES)
+MAX_DINO_HEIGHT = max(SPRITE_SIZES[name][1] for name in DINO_MASK_SPRITES)
+MAX_OBSTACLE_WIDTH = max(SPRITE_SIZES[name][0] for name in OBSTACLE_MASK_SPRITES)
+MAX_OBSTACLE_HEIGHT = max(SPRITE_SIZES[name][1] for name in OBSTACLE_MASK_SPRITES)
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def read_png_alpha(path):
+    """Solid pixels of an 8-bit RGBA or grey+alpha PNG as a (height, width) bool array.
+
+    Only what the sprites in assets/ need, so the simulation can build its
+    masks without pygame.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError(f"{path} is not a PNG file")
+
+    header, compressed = None, []
+    pos = 8
+    while pos < len(data):
+        length, chunk = struct.unpack(">I4s", data[pos:pos + 8])
+        if chunk == b"IHDR":
+            header = struct.unpack(">IIBBBBB", data[pos + 8:pos + 21])
+        elif chunk == b"IDAT":
+            compressed.append(data[pos + 8:pos + 8 + length])
+        pos += length + 12
+    width, height, depth, color_type, _, _, interlace = header
+    channels = {6: 4, 4: 2}.get(color_type)
+    if depth != 8 or channels is None or interlace:
+        raise ValueError(f"{path}: only non-interlaced 8-bit RGBA or grey+alpha PNGs are supported")
+
+    raw = zlib.decompress(b"".join(compressed))
+    stride = width * channels
+    pixels = np.zeros((height, stride), dtype=np.uint8)
+    previous = np.zeros(stride, dtype=np.int64)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = np.frombuffer(raw, np.uint8, stride, start + 1).astype(np.int64)
+        if kind == 1:  #sub: add the byte one pixel to the left
+            row = row.reshape(width, channels).cumsum(axis=0).reshape(stride)
+        elif kind == 2:  #up: add the byte above
+            row = row + previous
+        elif kind in (3, 4):  #average, paeth: depend on the bytes just decoded
+            row, up = row.tolist(), previous.tolist()
+            for i in range(stride):
+                left = row[i - channels] if i >= channels else 0
+                upper_left = up[i - channels] if i >= channels else 0
+                predicted = (left + up[i]) // 2 if kind == 3 else _paeth(left, up[i], upper_left)
+                row[i] = (row[i] + predicted) & 0xFF
+            row = np.array(row, dtype=np.int64)
+        previous = row & 0xFF
+        pixels[y] = previous
+    return pixels.reshape(height, width, channels)[..., -1] > ALPHA_THRESHOLD
+
+
+def sprite_mask(name):
+    return read_png_alpha(asset_path(name))
+
+
+def overlap_offsets(a, b):
+    """Where mask b touches mask a: result[dy + b_height - 1, dx + b_width - 1] is True
+    when b with its top left at (dx, dy) relative to a's shares a solid pixel with it."""
+    shape = (a.shape[0] + b.shape[0], a.shape[1] + b.shape[1])
+    #cross-correlation by FFT: the number of shared pixels at every offset at once
+    counts = np.fft.irfft2(np.fft.rfft2(a, shape) * np.conj(np.fft.rfft2(b, shape)), shape)
+    counts = np.roll(counts, (b.shape[0] - 1, b.shape[1] - 1), axis=(0, 1))
+    return counts[:shape[0] - 1, :shape[1] - 1] > 0.5
+
+
+def build_overlap_table():
+    """overlap_offsets for every (dino sprite, obstacle sprite) pair, padded to one array.
+
+    table[d, o, dy + MAX_OBSTACLE_HEIGHT - 1, dx + MAX_OBSTACLE_WIDTH - 1]
+    says whether obstacle sprite o at (dx, dy) from dino sprite d's top left
+    touches it; offsets outside the table never do.
+    """
+    dinos = [sprite_mask(name) for name in DINO_MASK_SPRITES]
+    obstacles = [sprite_mask(name) for name in OBSTACLE_MASK_SPRITES]
+    table = np.zeros((len(dinos), len(obstacles), MAX_OBSTACLE_HEIGHT + MAX_DINO_HEIGHT - 1,
+                      MAX_OBSTACLE_WIDTH + MAX_DINO_WIDTH - 1), dtype=bool)
+    for d, dino in enumerate(dinos):
+        for o, obstacle in enumerate(obstacles):
+            offsets = overlap_offsets(dino, obstacle)
+            top = MAX_OBSTACLE_HEIGHT - obstacle.shape[0]
+            left = MAX_OBSTACLE_WIDTH - obstacle.shape[1]
+            table[d, o, top:top + offsets.shape[0], left:left + offsets.shape[1]] = offsets
+    return table
+
+
+_overlap_table = None
+
+
+def overlap_table():
+    """build_overlap_table(), built on first use and kept for the life of the process."""
+    global _overlap_table
+    if _overlap_table is None:
+        _overlap_table = build_overlap_table()
+    return _overlap_table
+
+
+def dino_sprite_index(ducking, frame):
+    """Index into DINO_MASK_SPRITES; works on scalars and arrays."""
+    return 2 * ducking + frame
+
+
+def masks_overlap(dino_sprite, dino_x, dino_y, obstacle_sprite, obstacle_x, obstacle_y):
+    """Whether each dino's sprite shares a solid pixel with its obstacle's sprite.
+
+    All arguments are arrays of the same length (sprites are indices into
+    DINO_MASK_SPRITES and OBSTACLE_MASK_SPRITES, positions are top lefts).
+    """
+    table = overlap_table()
+    dy = np.asarray(obstacle_y) - dino_y + MAX_OBSTACLE_HEIGHT - 1
+    dx = np.asarray(obstacle_x) - dino_x + MAX_OBSTACLE_WIDTH - 1
+    inside = (dy >= 0) & (dy < table.shape[2]) & (dx >= 0) & (dx < table.shape[3])
+    touching = np.zeros(len(dx), dtype=bool)
+    touching[inside] = table[np.asarray(dino_sprite)[inside], np.asarray(obstacle_sprite)[inside],
+                             dy[inside].astype(np.int64), dx[inside].astype(np.int64)]
+    return touching
+
+
+def sprites_overlap(dino_sprite, dino_topleft, obstacle_sprite, obstacle_topleft):
+    """masks_overlap for one dino and one obstacle, by sprite name."""
+    return bool(masks_overlap([DINO_MASK_SPRITES.index(dino_sprite)], dino_topleft[0], dino_topleft[1],
+                              [OBSTACLE_MASK_SPRITES.index(obstacle_sprite)], [obstacle_topleft[0]],
+                              [obstacle_topleft[1]])[0])
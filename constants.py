@@ -15,3 +15,10 @@ SPEED = 7
 RUN_ANIMATION_TIME = 10 #for switching dino/bird images
 
 CACTUS_MIN_DISTANCE = 500
+
+#bird height above the ground -> flying level
+BIRD_HEIGHTS = {30: 'Low', 100: 'Mid', 180: 'High'}
+
+#obstacle kinds, as stored in env.DinoEnv's obstacle_type array
+OBSTACLE_TYPES = ("cactus", "bird")
+CACTUS, BIRD = 0, 1
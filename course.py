@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import random
+from collections import namedtuple
+
+from assets import CACTUS_SIZES, BIRD_SIZES
+from constants import WIDTH
+from difficulty import Difficulty, PRESETS
+
+#version 1 courses have no difficulty and are the original game
+COURSE_FORMAT_VERSION = 2
+
+OBSTACLE_SIZES = {
+    "cactus": CACTUS_SIZES,
+    "bird": BIRD_SIZES,
+}
+
+#one obstacle of a course: x is the midbottom x in course coordinates
+#(screen x + distance the world has scrolled), height is 0 for cacti
+Spawn = namedtuple("Spawn", ["obstacle_type", "variant", "x", "height"])
+
+
+class Course:
+    """The obstacle sequence of one game, driven by its own seeded RNG.
+
+    Spawns are generated on demand and cached, so any number of worlds (or
+    repeated evaluations) can share one course and only the first pays for the
+    RNG work. Each of the num_obstacles on-screen slots keeps its obstacle type,
+    and a freed slot respawns behind the rightmost obstacle, as in the original
+    game. difficulty (a difficulty.Difficulty) sets the obstacle mix and
+    spacing, and the speed of every world playing the course.
+    """
+
+    def __init__(self, seed=None, num_obstacles=3, difficulty=None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.num_obstacles = num_obstacles
+        self.difficulty = difficulty or Difficulty()
+        self.rng = random.Random(seed)
+        self.slot_types = [self.difficulty.slot_type(self.rng) for _ in range(num_obstacles)]
+        self.spawns = []
+
+    def __getitem__(self, index):
+        while len(self.spawns) <= index:
+            self.spawns.append(self.next_spawn())
+        return self.spawns[index]
+
+    def __len__(self):
+        """Number of spawns generated (or loaded) so far."""
+        return len(self.spawns)
+
+    def next_spawn(self):
+        obstacle_type = self.slot_types[len(self.spawns) % self.num_obstacles]
+        sizes = OBSTACLE_SIZES[obstacle_type]
+        variant = self.rng.randrange(len(sizes))
+
+        if self.spawns:
+            last_spawn = self.spawns[-1]
+            last_left = last_spawn.x - OBSTACLE_SIZES[last_spawn.obstacle_type][last_spawn.variant][0] // 2
+            #spaced for the speed the world will have reached by then
+            shortest, longest, jitter = self.difficulty.gaps(self.difficulty.speed_at_distance(last_spawn.x))
+            min_x = last_left + self.rng.randint(shortest, longest)
+            max_x = min_x + jitter
+        else:
+            min_x, max_x = WIDTH + 100, WIDTH + 300
+
+        height = 0
+        if obstacle_type == "bird":
+            height = self.difficulty.bird_height(self.rng)
+        return Spawn(obstacle_type, variant, self.rng.randint(min_x, max_x), height)
+
+    def precompute(self, count):
+        """Generate the first count spawns up front."""
+        if count > 0:
+            self[count - 1]
+        return self
+
+    def to_dict(self):
+        return {
+            "version": COURSE_FORMAT_VERSION,
+            "seed": self.seed,
+            "num_obstacles": self.num_obstacles,
+            "difficulty": self.difficulty.to_dict(),
+            "slot_types": self.slot_types,
+            "spawns": [list(spawn) for spawn in self.spawns],
+        }
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f), path)
+
+    @classmethod
+    def from_dict(cls, data, name="course"):
+        """Rebuild a saved course. The saved spawns are replayed exactly; any further
+        spawns are generated from the seed as if the course had never been saved."""
+        if data.get("version") not in (1, COURSE_FORMAT_VERSION):
+            raise ValueError(f"{name}: unsupported course format version {data.get('version')!r}")
+
+        difficulty = Difficulty.from_dict(data["difficulty"]) if "difficulty" in data else Difficulty()
+        course = cls(data["seed"], data["num_obstacles"], difficulty)
+        #advance the RNG past the saved spawns, then keep the saved ones
+        course.precompute(len(data["spawns"]))
+        course.slot_types = data["slot_types"]
+        course.spawns = [Spawn(*spawn) for spawn in data["spawns"]]
+        return course
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate an obstacle course and save it for replay.")
+    parser.add_argument("path", help="where to write the course (JSON)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--obstacles", type=int, default=2,
+                        help="obstacles on screen at once (training uses 2, game.py uses 3)")
+    parser.add_argument("--difficulty", choices=sorted(PRESETS), default="classic",
+                        help="speed and obstacle settings (see difficulty.py)")
+    parser.add_argument("--length", type=int, default=1000, help="number of spawns to precompute")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    course = Course(args.seed, args.obstacles, PRESETS[args.difficulty]).precompute(args.length)
+    course.save(args.path)
+    print(f"Course with seed {course.seed} ({len(course)} obstacles) saved to '{args.path}'")
@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+from constants import SPEED, CACTUS_MIN_DISTANCE, BIRD_HEIGHTS
+
+#the score goes up this much every frame
+SCORE_PER_FRAME = 0.1
+#how obstacles are hit: bounding boxes, or pixel masks
+HITBOXES = ("box", "mask")
+
+
+class Difficulty:
+    """How hard one world's game is: scroll speed over score, obstacle spacing and mix.
+
+    The world scrolls start_speed pixels per frame, one more for every `ramp`
+    points of score (never if ramp is None), up to max_speed. With
+    speed_aware spacing the gaps between obstacles grow with the speed, so
+    the time to react stays the same; density divides them. Obstacle slots
+    are cacti with probability cactus_chance, and bird_weights gives the
+    relative odds of each of BIRD_HEIGHTS (None: all equally likely).
+    hitboxes is "box" to collide the sprites' bounding boxes or "mask" to
+    collide their solid pixels (see collision.py).
+    The defaults are the original game.
+    """
+
+    def __init__(self, start_speed=SPEED, max_speed=None, ramp=None, speed_aware=True, density=1.0,
+                 cactus_chance=0.7, bird_weights=None, hitboxes="box"):
+        if hitboxes not in HITBOXES:
+            raise ValueError(f"hitboxes must be one of {HITBOXES}, not {hitboxes!r}")
+        self.start_speed = start_speed
+        self.max_speed = start_speed if max_speed is None else max(max_speed, start_speed)
+        self.ramp = ramp
+        self.speed_aware = speed_aware
+        self.density = density
+        self.cactus_chance = cactus_chance
+        self.bird_weights = bird_weights
+        self.hitboxes = hitboxes
+
+    def speed(self, score):
+        """Pixels per frame at this score."""
+        #the same arithmetic as speeds(), so World and DinoEnv change speed on the same frame
+        steps = math.floor(score / (self.ramp or math.inf))
+        return int(min(self.max_speed, self.start_speed + steps))
+
+    def speed_at_distance(self, distance):
+        """Speed once the world has scrolled this far (for spacing spawns before they are played)."""
+        speed, covered = self.start_speed, 0
+        while self.ramp and speed < self.max_speed:
+            covered += self.ramp / SCORE_PER_FRAME * speed
+            if covered > distance:
+                break
+            speed += 1
+        return speed
+
+    def gaps(self, speed):
+        """(shortest, longest) distance from an obstacle's left edge to the next one's, and the extra jitter."""
+        scale = (speed / SPEED if self.speed_aware else 1) / self.density
+        return round(CACTUS_MIN_DISTANCE * scale), round((CACTUS_MIN_DISTANCE + 500) * scale), round(200 * scale)
+
+    def slot_type(self, rng):
+        return "cactus" if rng.random() <= self.cactus_chance else "bird"
+
+    def bird_height(self, rng):
+        if self.bird_weights is None:
+            return rng.choice(list(BIRD_HEIGHTS))
+        return rng.choices(list(BIRD_HEIGHTS), weights=self.bird_weights)[0]
+
+    def harder(self, speed_steps=0, density_step=0.0, max_density=None):
+        """A copy that starts speed_steps pixels per frame faster and is density_step denser."""
+        data = self.to_dict()
+        data["start_speed"] += speed_steps
+        data["max_speed"] = max(data["max_speed"], data["start_speed"])
+        data["density"] += density_step
+        if max_density is not None:
+            data["density"] = min(data["density"], max(max_density, self.density))
+        return Difficulty.from_dict(data)
+
+    def to_dict(self):
+        return {
+            "start_speed": self.start_speed,
+            "max_speed": self.max_speed,
+            "ramp": self.ramp,
+            "speed_aware": self.speed_aware,
+            "density": self.density,
+            "cactus_chance": self.cactus_chance,
+            "bird_weights": self.bird_weights,
+            "hitboxes": self.hitboxes,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return Difficulty(**data)
+
+
+def speeds(score, start_speed, max_speed, ramp):
+    """Difficulty.speed for arrays: one score, start_speed, max_speed and ramp (inf for none) per world."""
+    return np.minimum(max_speed, start_speed + np.floor(score / ramp).astype(np.int64))
+
+
+#named difficulties for the command lines
+PRESETS = {
+    #the original game: always 7 pixels per frame
+    "classic": Difficulty(),
+    #the original game, but only touching pixels count as a hit
+    "pixel": Difficulty(hitboxes="mask"),
+    #speeds up by one every 25 points, from 7 to 13 at score 150
+    "progressive": Difficulty(max_speed=13, ramp=25),
+    #progressive, denser and with more birds at mid height (only passable by ducking)
+    "hard": Difficulty(max_speed=13, ramp=25, density=1.2, cactus_chance=0.6, bird_weights=(1, 2, 1)),
+}
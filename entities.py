@@ -1,18 +1,101 @@
-import random
-from constants import GROUND_HEIGHT, SPEED, DINO_OFFSET, RUN_ANIMATION_TIME, WIDTH, CACTUS_MIN_DISTANCE
+from assets import DINO_SPRITES, OBSTACLE_SPRITES
+from collision import sprites_overlap
+from constants import GROUND_HEIGHT, SPEED, DINO_OFFSET, RUN_ANIMATION_TIME, BIRD_HEIGHTS
+
+
+def to_int(value):
+    """Round half away from zero, matching how pygame.Rect stores float coordinates."""
+    if value >= 0:
+        return int(value + 0.5)
+    return -int(-value + 0.5)
+
+
+class Box:
+    """Integer rectangle with the subset of pygame.Rect behaviour the simulation uses."""
+
+    #entities are created by the thousand during training: no per-instance __dict__
+    __slots__ = ("_x", "_y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        self._x = to_int(x)
+        self._y = to_int(y)
+        self.width = width
+        self.height = height
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = to_int(value)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = to_int(value)
+
+    left = x
+    top = y
+
+    @property
+    def right(self):
+        return self._x + self.width
+
+    @right.setter
+    def right(self, value):
+        self._x = to_int(value) - self.width
+
+    @property
+    def bottom(self):
+        return self._y + self.height
+
+    @bottom.setter
+    def bottom(self, value):
+        self._y = to_int(value) - self.height
+
+    @property
+    def midbottom(self):
+        return self._x + self.width // 2, self._y + self.height
+
+    @midbottom.setter
+    def midbottom(self, value):
+        self._x = to_int(value[0]) - self.width // 2
+        self._y = to_int(value[1]) - self.height
+
+    @property
+    def topleft(self):
+        return self._x, self._y
+
+    @classmethod
+    def from_size(cls, size, **kwargs):
+        """Like Surface.get_rect(**kwargs): a box of the given size, positioned by keyword."""
+        box = cls(0, 0, size[0], size[1])
+        for attr, value in kwargs.items():
+            setattr(box, attr, value)
+        return box
+
+    def colliderect(self, other):
+        return (self.width > 0 and self.height > 0 and other.width > 0 and other.height > 0
+                and self._x < other._x + other.width and other._x < self._x + self.width
+                and self._y < other._y + other.height and other._y < self._y + self.height)
 
 
 class Ground:
-    def __init__(self, image):
-        self.image = image
-        self.width = self.image.get_width()
-        self.rect1 = self.image.get_rect(midbottom=(0, GROUND_HEIGHT))
-        self.rect2 = self.image.get_rect(midbottom=(self.width, GROUND_HEIGHT))
+    __slots__ = ("width", "rect1", "rect2", "current_x")
+
+    def __init__(self, size):
+        self.width = size[0]
+        self.rect1 = Box.from_size(size, midbottom=(0, GROUND_HEIGHT))
+        self.rect2 = Box.from_size(size, midbottom=(self.width, GROUND_HEIGHT))
         self.current_x = 0
 
-    def move(self):
-        self.rect1.x -= SPEED
-        self.rect2.x -= SPEED
+    def move(self, speed=SPEED):
+        self.rect1.x -= speed
+        self.rect2.x -= speed
 
         #if the first ground image moves off-screen, reset its position
         if self.rect1.right <= 0:
@@ -24,19 +107,13 @@ class Ground:
             self.rect2.left = self.rect1.right
             self.current_x = self.rect2.left
 
-    def draw(self, screen):
-        screen.blit(self.image, self.rect1)
-        screen.blit(self.image, self.rect2)
-
 
 class Dino:
-    def __init__(self, run_1_image, run_2_image, duck_1_image, duck_2_image, dead_image):
-        self.run_1_image = run_1_image
-        self.run_2_image = run_2_image
-        self.duck_1_image = duck_1_image
-        self.duck_2_image = duck_2_image
-        self.dead_image = dead_image
-        self.rect = self.run_1_image.get_rect(midbottom=(100, GROUND_HEIGHT - DINO_OFFSET))
+    __slots__ = ("rect", "jump_speed", "double_jump_speed", "low_gravity", "gravity", "high_gravity", "velocity",
+                 "ducking", "dead", "run_time", "score")
+
+    def __init__(self, size):
+        self.rect = Box.from_size(size, midbottom=(100, GROUND_HEIGHT - DINO_OFFSET))
         self.jump_speed = -20
         self.double_jump_speed = -25
         self.low_gravity = 0.8
@@ -74,93 +151,83 @@ class Dino:
     def die(self):
         self.dead = True
 
-    def get_image(self):
+    def animate(self):
+        """Advance the run/duck animation and lower the dino while ducking.
+
+        Called once per frame whether or not the dino is drawn, so headless runs
+        see exactly the same positions as rendered ones.
+        """
         if self.dead:
-            return self.dead_image
-        elif self.ducking and self.rect.bottom == GROUND_HEIGHT - DINO_OFFSET:
+            return
+        if self.ducking and self.rect.bottom == GROUND_HEIGHT - DINO_OFFSET:
             self.rect.bottom = GROUND_HEIGHT + 20
-            self.run_time += 1
-            if self.run_time // RUN_ANIMATION_TIME % 2 == 0:
-                return self.duck_1_image
-            else:
-                return self.duck_2_image
-            # return self.duck_image
-        else:
-            # Alternate imgs between run frames
-            self.run_time += 1
-            if self.run_time // RUN_ANIMATION_TIME % 2 == 0:
-                return self.run_1_image
-            else:
-                return self.run_2_image
-
-    def draw(self, screen):
-        screen.blit(self.get_image(), self.rect)
+        self.run_time += 1
+
+    def pose(self):
+        """Which sprite set the dino is showing: 'dead', 'duck' or 'run'."""
+        if self.dead:
+            return "dead"
+        elif self.ducking and self.rect.bottom == GROUND_HEIGHT + 20:
+            return "duck"
+        return "run"
+
+    def frame(self):
+        # Alternate between the two run/duck frames
+        return self.run_time // RUN_ANIMATION_TIME % 2
+
+    def sprite(self):
+        return DINO_SPRITES[(self.pose(), self.frame())]
 
 
 class Obstacle:
-    def __init__(self, images, obstacle_type, previous_obstacle=None, obstacles=None):
-        self.images = images
+    __slots__ = ("sizes", "obstacle_type", "variant", "rect")
+
+    def __init__(self, sizes, obstacle_type, variant, x, height=0):
+        #sizes: hitbox (width, height) of each sprite variant, variant is an index into it
+        #x: midbottom x on screen, height: how far above the ground the obstacle sits
+        self.sizes = sizes
         self.obstacle_type = obstacle_type
-        self.image = random.choice(self.images)
-        self.rect = self.image.get_rect()
-        self.previous_obstacle = previous_obstacle
-        self.obstacles = obstacles
-        self.spawn_new_obstacle()
-
-    def spawn_new_obstacle(self):
-        self.image = random.choice(self.images)
-
-        if self.obstacles:
-            last_obstacle = max(self.obstacles, key=lambda obj: obj.rect.left)
-            min_x = last_obstacle.rect.left + random.randint(CACTUS_MIN_DISTANCE, CACTUS_MIN_DISTANCE + 500)
-            if self.obstacle_type == "cactus":
-                self.rect = self.image.get_rect(midbottom=(random.randint(min_x, min_x + 200), GROUND_HEIGHT))
-            elif self.obstacle_type == "bird":
-                posY = random.choice([30, 100, 180])
-                self.flying_level = 'Low' if posY==30 else 'Mid' if posY==100 else 'High'
-                self.rect = self.image.get_rect(midbottom=(random.randint(min_x, min_x + 200), GROUND_HEIGHT - posY)) #[GROUND_HEIGHT - 30, GROUND_HEIGHT - 100, GROUND_HEIGHT - 180]
-
-        else:
-            if self.obstacle_type == "cactus":
-                self.rect = self.image.get_rect(midbottom=(random.randint(WIDTH + 100, WIDTH + 300), GROUND_HEIGHT))
-            elif self.obstacle_type == "bird":
-                posY = random.choice([30, 100, 180])
-                self.flying_level = 'Low' if posY==30 else 'Mid' if posY==100 else 'High'
-                self.rect = self.image.get_rect(midbottom=(random.randint(WIDTH + 100, WIDTH + 300), GROUND_HEIGHT - posY))
+        self.variant = variant
+        self.rect = Box.from_size(self.sizes[self.variant], midbottom=(x, GROUND_HEIGHT - height))
 
-    def move(self):
-        self.rect.x -= SPEED
-        if self.rect.right <= 0:
-            self.spawn_new_obstacle()
+    def move(self, speed=SPEED):
+        self.rect.x -= speed
+
+    def off_screen(self):
+        return self.rect.right <= 0
 
-    def draw(self, screen):
-        screen.blit(self.image, self.rect)
+    def sprite(self):
+        return OBSTACLE_SPRITES[self.obstacle_type][self.variant]
 
-    def collides_with(self, dino):
+    def collides_with(self, dino, masks=False):
+        #masks: compare the solid pixels of the sprites drawn at both rects instead of the rects
         if self.obstacle_type == "bird":
             if self.flying_level == "Mid" and dino.ducking:
                 return False
 
+        if masks:
+            return sprites_overlap(dino.sprite(), dino.rect.topleft, self.sprite(), self.rect.topleft)
         return self.rect.colliderect(dino.rect)
 
 
 class Cactus(Obstacle):
-    def __init__(self, images, previous_obstacle=None, obstacles=None):
-        super().__init__(images, "cactus", previous_obstacle, obstacles)
+    __slots__ = ()
+
+    def __init__(self, sizes, variant, x):
+        super().__init__(sizes, "cactus", variant, x)
 
 
 class Bird(Obstacle):
-    def __init__(self, images, previous_obstacle=None, obstacles=None):
+    __slots__ = ("flap_counter", "flying_level")
+
+    def __init__(self, sizes, variant, x, height):
         self.flap_counter = 0
-        self.flying_level = None
-        super().__init__(images, "bird", previous_obstacle, obstacles)
+        self.flying_level = BIRD_HEIGHTS[height]
+        super().__init__(sizes, "bird", variant, x, height)
 
-    def move(self):
-        self.rect.x -= SPEED
+    def move(self, speed=SPEED):
+        self.rect.x -= speed
         self.flap_counter += 1
         if self.flap_counter >= 10:  #alternating bird image for flapping
             self.flap_counter = 0
-            self.image = self.images[0] if self.image == self.images[1] else self.images[1]
-
-        if self.rect.right <= 0:
-            self.spawn_new_obstacle()
\ No newline at end of file
+            self.variant = 0 if self.variant == 1 else 1
@@ -0,0 +1,207 @@
+import random
+
+import numpy as np
+
+from batch import DinoArrays, DINO_X
+from collision import OBSTACLE_SPRITE_BASE
+from constants import GROUND_HEIGHT, BIRD_HEIGHTS, OBSTACLE_TYPES, BIRD
+from course import Course, OBSTACLE_SIZES
+from difficulty import speeds
+from observations import ObservationBuilder
+
+
+class DinoEnv(DinoArrays):
+    """num_worlds independent single-dino games stepped as one NumPy batch.
+
+    Gym-style interface: reset(seed) returns the first observation and
+    step(actions) returns (observation, rewards, dones, info). World i has its
+    own course; its dino is dino i of DinoArrays and its obstacles are row i of
+    the (num_worlds, num_obstacles) obstacle arrays. The rules are those of
+    simulation.World, so a world here plays exactly like a World with one dino
+    on the same course.
+
+    Each row of obstacle slots is a ring buffer like simulation.ObstacleQueue:
+    spawns fill the slots in turn, so the slot after the last one filled
+    (`head`) holds the leftmost obstacle and reading on from there goes
+    left to right.
+
+    A world is done once its dino dies (or max_frames is reached); it then
+    stands still until the next reset().
+    """
+
+    def __init__(self, num_worlds, num_obstacles=2, frame_skip=1, max_frames=None, seed=None, courses=None,
+                 observations=None, difficulty=None):
+        #frame_skip: each step() holds the actions for this many frames
+        #max_frames: worlds are done (truncated) after this many frames
+        #observations: observations.ObservationBuilder for observation() (default: get_game_state's 4 values)
+        #difficulty: difficulty.Difficulty of the courses reset() generates
+        self.observations = observations or ObservationBuilder()
+        self.num_worlds = num_worlds
+        self.num_obstacles = num_obstacles
+        self.frame_skip = frame_skip
+        self.max_frames = max_frames
+        self.difficulty = difficulty
+        self.reset(seed, courses)
+
+    def reset(self, seed=None, courses=None):
+        """Start every world over and return the observation.
+
+        courses: one course.Course per world, which also sets num_obstacles (as
+        in World.reset). Otherwise each world gets a new course whose seed is
+        drawn from `seed` (random if None), at the env's difficulty.
+        """
+        if courses is None:
+            rng = random.Random(seed)
+            courses = [Course(rng.randrange(2 ** 32), self.num_obstacles, self.difficulty)
+                       for _ in range(self.num_worlds)]
+        self.courses = list(courses)
+        #every world has the same number of obstacle slots
+        num_obstacles = {course.num_obstacles for course in self.courses}
+        if len(num_obstacles) != 1:
+            raise ValueError(f"all courses of a DinoEnv need the same num_obstacles, got {sorted(num_obstacles)}")
+        self.num_obstacles = num_obstacles.pop()
+        self.reset_dinos(self.num_worlds)
+        #each world's speed comes from its course's difficulty.Difficulty
+        difficulties = [course.difficulty for course in self.courses]
+        self.start_speed = np.array([d.start_speed for d in difficulties], dtype=np.int64)
+        self.max_speed = np.array([d.max_speed for d in difficulties], dtype=np.int64)
+        self.ramp = np.array([d.ramp or np.inf for d in difficulties], dtype=np.float64)
+        #pixels each world scrolled in the last frame
+        self.speed = self.start_speed.copy()
+        #worlds whose obstacles are hit by pixel masks rather than boxes
+        self.masked = np.array([d.hitboxes == "mask" for d in difficulties], dtype=bool)
+
+        #how far each world has scrolled: course x = screen x + distance
+        self.distance = np.zeros(self.num_worlds, dtype=np.int64)
+        self.frames = np.zeros(self.num_worlds, dtype=np.int64)
+        self.next_spawn = np.zeros(self.num_worlds, dtype=np.int64)
+
+        shape = (self.num_worlds, self.num_obstacles)
+        #x, y, width, height of every obstacle, in the layout collide() takes;
+        #obstacle_x etc. are views into it, so nothing is copied per frame
+        self.boxes = np.zeros(shape + (4,), dtype=np.int64)
+        self.obstacle_x = self.boxes[..., 0]
+        self.obstacle_y = self.boxes[..., 1]
+        self.obstacle_width = self.boxes[..., 2]
+        self.obstacle_height = self.boxes[..., 3]
+        self.obstacle_type = np.zeros(shape, dtype=np.int8)
+        self.variant = np.zeros(shape, dtype=np.int8)
+        self.flap_counter = np.zeros(shape, dtype=np.int64)
+        #birds at mid height can be ducked under
+        self.duckable = np.zeros(shape, dtype=bool)
+        #collision.OBSTACLE_MASK_SPRITES index of the sprite each obstacle shows
+        self.sprite = np.zeros(shape, dtype=np.int64)
+
+        for i in range(self.num_worlds):
+            for k in range(self.num_obstacles):
+                self.spawn_obstacle(i, k)
+        return self.observation()
+
+    def spawn_obstacle(self, i, k):
+        """World.spawn_obstacle for obstacle slot k of world i."""
+        spawn = self.courses[i][self.next_spawn[i]]
+        self.next_spawn[i] += 1
+        width, height = OBSTACLE_SIZES[spawn.obstacle_type][spawn.variant]
+
+        #midbottom at (spawn.x - distance, GROUND_HEIGHT - spawn.height), as in Obstacle
+        self.obstacle_x[i, k] = spawn.x - self.distance[i] - width // 2
+        self.obstacle_y[i, k] = GROUND_HEIGHT - spawn.height - height
+        self.obstacle_width[i, k] = width
+        self.obstacle_height[i, k] = height
+        self.obstacle_type[i, k] = OBSTACLE_TYPES.index(spawn.obstacle_type)
+        self.variant[i, k] = spawn.variant
+        self.flap_counter[i, k] = 0
+        self.sprite[i, k] = OBSTACLE_SPRITE_BASE[self.obstacle_type[i, k]] + spawn.variant
+        self.duckable[i, k] = spawn.obstacle_type == "bird" and BIRD_HEIGHTS[spawn.height] == "Mid"
+
+    @property
+    def head(self):
+        """Slot of the leftmost obstacle in each world."""
+        return self.next_spawn % self.num_obstacles
+
+    def step(self, actions):
+        """Hold one action per world for frame_skip frames.
+
+        Returns the observation, the score gained in each world (rewards), which
+        worlds are done, and an info dict with the total score and death flags.
+        """
+        actions = np.asarray(actions)
+        start_score = self.score.copy()
+        for _ in range(self.frame_skip):
+            if not self.active.any():
+                break
+            self.advance(actions)
+
+        if self.max_frames is not None:
+            self.remove(self.frames >= self.max_frames)
+
+        rewards = self.score - start_score
+        info = {"score": self.score.copy(), "dead": self.dead.copy()}
+        return self.observation(), rewards, ~self.active, info
+
+    def advance(self, actions):
+        """One frame with these actions, without building observations, rewards or info."""
+        self.apply_actions(actions)
+        self.update()
+
+    def update(self):
+        """Advance one frame in every world that is not done."""
+        alive = self.active.copy()
+        if not alive.any():
+            self.collision_checks = 0
+            return
+
+        self.speed[alive] = speeds(self.score[alive], self.start_speed[alive], self.max_speed[alive],
+                                   self.ramp[alive])
+        self.move_dinos(alive)
+
+        #World.move_obstacles, for every world at once
+        self.distance[alive] += self.speed[alive]
+        moving = np.broadcast_to(alive[:, None], self.obstacle_x.shape)
+        self.obstacle_x -= (self.speed * alive)[:, None]
+
+        flapping = moving & (self.obstacle_type == BIRD)
+        self.flap_counter[flapping] += 1
+        flapped = flapping & (self.flap_counter >= 10)  #alternating bird image for flapping
+        self.flap_counter[flapped] = 0
+        self.variant[flapped] = 1 - self.variant[flapped]
+        self.sprite[flapped] = OBSTACLE_SPRITE_BASE[BIRD] + self.variant[flapped]
+
+        #only the leftmost obstacle of a world can have left the screen
+        head = self.head
+        rows = np.arange(self.num_worlds)
+        gone = alive & (self.obstacle_x[rows, head] + self.obstacle_width[rows, head] <= 0)
+        for i in gone.nonzero()[0]:
+            self.spawn_obstacle(i, head[i])
+
+        if self.masked.any():
+            hit = self.collide(alive, self.boxes, self.duckable, self.sprite, self.masked)
+        else:
+            hit = self.collide(alive, self.boxes, self.duckable)
+
+        self.score[alive] += 0.1
+        self.animate_dinos(alive & ~hit)
+        self.frames[alive] += 1
+
+    def death_cause(self, i):
+        """What world i's dino ran into: "cactus", "bird Low", "bird Mid" or "bird High" (None if it did not die)."""
+        k = self.killed_by[i]
+        if k < 0:
+            return None
+        if self.obstacle_type[i, k] == BIRD:
+            return f"bird {BIRD_HEIGHTS[int(GROUND_HEIGHT - self.obstacle_y[i, k] - self.obstacle_height[i, k])]}"
+        return "cactus"
+
+    def ahead(self, j=0):
+        """Slot of the j-th obstacle ahead of the dino in each world, and whether there is one."""
+        #spawns are spaced much wider than the dino's x, so only the leftmost
+        #obstacle can be behind the dino
+        rows = np.arange(self.num_worlds)
+        head = self.head
+        passed = self.obstacle_x[rows, head] + self.obstacle_width[rows, head] <= DINO_X
+        index = passed + j
+        return (head + index) % self.num_obstacles, index < self.num_obstacles
+
+    def observation(self):
+        """The observations of every world as a (num_worlds, observations.num_inputs) array."""
+        return self.observations.build(self)
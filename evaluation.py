@@ -0,0 +1,320 @@
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from batch import outputs_to_actions
+from course import Course
+from difficulty import Difficulty
+from env import DinoEnv
+from inference import BatchNetwork
+from profiling import Profiler
+from simulation import NOTHING
+
+#a dino that reaches this score has finished its episode
+SCORE_LIMIT = 200
+#(score, bonus): each bonus is paid once, on the frame the dino first reaches the score
+MILESTONES = ((50, 50), (100, 75), (200, 100))
+
+
+#the same as arrays, with a final milestone that is never reached
+MILESTONE_SCORES = np.array([score for score, bonus in MILESTONES] + [np.inf])
+MILESTONE_BONUSES = np.array([bonus for score, bonus in MILESTONES] + [0.0])
+
+
+def death_penalty(score):
+    return 2 + np.maximum(50 - score, 0) * 0.1  #large penalty for early death
+
+
+def episode_fitness_bounds(tick_budget=None):
+    """Lowest and highest fitness one episode can give (dying on the first frame, and finishing)."""
+    score, best, milestone, frames = 0.0, 0.0, 0, 0
+    while True:
+        #the same score steps as env.DinoEnv, so float rounding matches too
+        score += 0.1
+        frames += 1
+        best += 0.2 * score + 1
+        while milestone < len(MILESTONES) and score >= MILESTONES[milestone][0]:
+            best += MILESTONES[milestone][1]
+            milestone += 1
+        if score >= SCORE_LIMIT or (tick_budget and frames >= tick_budget):
+            break
+    worst = 0.2 * 0.1 - death_penalty(0.1)
+    return float(worst), best
+
+
+def evaluate_genomes(genomes, config, course, on_frame=None, frame_skip=1, observations=None, profiler=None,
+                     tick_budget=None):
+    """Run genomes together on `course` (a course.Course) and return their fitnesses.
+
+    Every genome plays its own world of a DinoEnv and all worlds play the same
+    course, so any split of a generation into chunks gives the same fitness.
+    The networks decide every frame_skip frames and their action is repeated
+    in between; physics and fitness bookkeeping still run every frame.
+    on_frame(env, fitness, playing) is called after every physics frame, with
+    the fitness array and the indices of the dinos still being evaluated.
+    observations is the observations.ObservationBuilder for the network inputs.
+    Phase times and counts are added to profiler (a profiling.Profiler).
+    A dino stops at SCORE_LIMIT, or when it has played tick_budget frames,
+    keeping the fitness it has.
+    """
+    profiler = profiler or Profiler()
+    num_genomes = len(genomes)
+    fitness = np.zeros(num_genomes)  #starting fitness at 0
+    #index of the next milestone bonus of each dino
+    milestone = np.zeros(num_genomes, dtype=np.int64)
+    frame_limit = tick_budget or np.inf
+
+    #every network of the chunk, evaluated in one vectorized pass per tick
+    networks = BatchNetwork.create(genomes, config)
+
+    env = DinoEnv(num_genomes, course.num_obstacles, courses=[course] * num_genomes, observations=observations)
+    #live[:count] are the dinos still being evaluated; a finished one is swapped with the last
+    #live one, so the array never moves or grows and no dino is skipped
+    live = np.arange(num_genomes)
+    count = num_genomes
+    actions = np.full(num_genomes, NOTHING, dtype=np.int8)
+    frame = 0
+
+    while count:
+        playing = live[:count]
+        start = time.perf_counter()
+        env.advance(actions)
+        start = profiler.add("physics", start)
+        profiler.count("ticks")
+        profiler.count("dino_steps", count)
+        #only the pairs that got past the broad phase cost a real test
+        profiler.count("collision_checks", env.collision_checks)
+
+        if on_frame is not None:
+            on_frame(env, fitness, playing)
+            start = profiler.add("render", start)
+
+        #retrieving game state for NEAT model and decide action (all live dinos at once)
+        if frame % frame_skip == 0:
+            deciding = playing[~env.dead[playing]]
+            observation = env.observation()
+            actions[deciding] = outputs_to_actions(networks.activate(observation[deciding], deciding))
+            profiler.count("activations", len(deciding))
+            start = profiler.add("activation", start)
+        frame += 1
+
+        #incrementing fitness based on score
+        distance_traveled = env.score[playing]
+        dead = env.dead[playing]
+        fitness[playing] += 0.2 * distance_traveled  # fitness proportionally to distance
+        #reward for staying alive, large penalty for early death
+        fitness[playing] += np.where(dead, -death_penalty(distance_traveled), 1)
+
+        #reward, once per milestone
+        reached = ~dead & (distance_traveled >= MILESTONE_SCORES[milestone[playing]])
+        while reached.any():
+            rows = playing[reached]
+            fitness[rows] += MILESTONE_BONUSES[milestone[rows]]
+            milestone[rows] += 1
+            reached[reached] = distance_traveled[reached] >= MILESTONE_SCORES[milestone[rows]]
+
+        finished = ~dead & ((distance_traveled >= SCORE_LIMIT) | (env.frames[playing] >= frame_limit))
+        done = dead | finished
+        if done.any():
+            #worlds whose dino finished stop (dead ones already have)
+            env.remove(playing[finished])
+            for j in np.flatnonzero(done)[::-1]:
+                count -= 1
+                live[j] = live[count]
+        profiler.add("bookkeeping", start)
+
+    return fitness.tolist()
+
+
+class Curriculum:
+    """Courses that get harder as training goes on.
+
+    Every `every` generations the starting scroll speed goes up by
+    speed_step pixels per frame (up to max_speed) and the obstacle density by
+    density_step (up to max_density), starting from the scheduler's difficulty.
+    """
+
+    def __init__(self, every=10, speed_step=1, max_speed=13, density_step=0.1, max_density=2.0):
+        self.every = every
+        self.speed_step = speed_step
+        self.max_speed = max_speed
+        self.density_step = density_step
+        self.max_density = max_density
+
+    def difficulty(self, generation, base):
+        """base (a difficulty.Difficulty) made harder for this generation."""
+        stage = generation // self.every
+        speed_steps = max(0, min(stage * self.speed_step, self.max_speed - base.start_speed))
+        return base.harder(speed_steps, stage * self.density_step, self.max_density)
+
+
+class EvaluationScheduler:
+    """Decides what each generation is evaluated on and which genomes are worth evaluating.
+
+    Every generation plays `episodes` courses (seeded from `seed`, at
+    `difficulty` made harder by the curriculum, or always the fixed
+    `course`) and a genome's fitness is its mean over them. tick_budget caps
+    the frames of one episode. With top_k (which needs two episodes or
+    more), after each episode the genomes that could not catch up with the
+    top_k even by finishing every remaining episode are culled: they are
+    charged the worst episode fitness for the episodes they skip, so they
+    still rank below the top_k as they would have anyway.
+    """
+
+    def __init__(self, seed=None, num_obstacles=2, course=None, episodes=1, tick_budget=None, top_k=None,
+                 curriculum=None, difficulty=None):
+        self.rng = random.Random(seed)
+        self.num_obstacles = num_obstacles
+        self.difficulty = difficulty or Difficulty()
+        self.course = course
+        self.episodes = 1 if course is not None else max(1, episodes)  #a fixed course plays the same every time
+        self.tick_budget = tick_budget
+        if top_k and self.episodes < 2:
+            raise ValueError("top_k culls between episodes, so it needs at least 2 episodes (and no fixed course)")
+        self.top_k = top_k
+        self.curriculum = curriculum
+        self.generation = 0
+        self.courses = []  #the courses of the generation evaluated last
+        self.prepared = None  #courses drawn by prepare() for the next evaluate()
+        self.before_prepared = None  #state() from before prepare() drew them
+
+    def next_courses(self):
+        if self.course is not None:
+            courses = [self.course]
+        else:
+            difficulty = self.difficulty
+            if self.curriculum:
+                difficulty = self.curriculum.difficulty(self.generation, difficulty)
+            courses = [Course(self.rng.randrange(2 ** 32), self.num_obstacles, difficulty)
+                       for _ in range(self.episodes)]
+        self.generation += 1
+        self.courses = courses
+        return courses
+
+    def prepare(self):
+        """Draw the next generation's courses now rather than in evaluate().
+
+        Pipelined training (pipeline.py) calls this on the main thread before
+        it starts the evaluation in the background, so state() does not
+        depend on how far that evaluation has got.
+        """
+        self.before_prepared = {"rng": self.rng.getstate(), "generation": self.generation}
+        self.prepared = self.next_courses()
+
+    def evaluate(self, num_genomes, run_episode, profiler=None):
+        """Fitness of genomes 0..num_genomes-1 for the next generation.
+
+        run_episode(indices, course) plays those genomes on course and returns
+        their episode fitness, in order. The wall time of the whole
+        generation is added to profiler as "evaluate".
+        """
+        start = time.perf_counter()
+        courses = self.prepared if self.prepared is not None else self.next_courses()
+        self.prepared = None
+        worst, best = episode_fitness_bounds(self.tick_budget)
+        totals = [0.0] * num_genomes
+        playing = list(range(num_genomes))
+        for episode, course in enumerate(courses):
+            for i, fitness in zip(playing, run_episode(playing, course)):
+                totals[i] += fitness
+
+            remaining = len(courses) - episode - 1
+            if self.top_k and remaining and len(playing) > self.top_k:
+                #the k-th best of the totals every genome is sure to reach
+                threshold = sorted((totals[i] + remaining * worst for i in playing), reverse=True)[self.top_k - 1]
+                culled = {i for i in playing if totals[i] + remaining * best < threshold}
+                for i in culled:
+                    totals[i] += remaining * worst
+                playing = [i for i in playing if i not in culled]
+                if profiler is not None:
+                    profiler.count("culled", len(culled))
+        if profiler is not None:
+            profiler.add("evaluate", start)
+        return [total / len(courses) for total in totals]
+
+    def state(self):
+        #once prepare() is used, checkpoints are written after the next generation
+        #has been drawn, and a restored run has to draw it again
+        if self.before_prepared is not None:
+            return self.before_prepared
+        return {"rng": self.rng.getstate(), "generation": self.generation}
+
+    def restore(self, state):
+        self.rng.setstate(state["rng"])
+        self.generation = state["generation"]
+        self.prepared = self.before_prepared = None
+
+
+def chunk(items, workers, size=None):
+    """Split items into lists of size (by default, enough for about two per worker)."""
+    #a couple of chunks per worker keeps the pool busy when chunks finish unevenly
+    size = size or max(1, -(-len(items) // (workers * 2)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _evaluate_chunk(genomes, config, course, frame_skip, observations, tick_budget):
+    profiler = Profiler()
+    fitness = evaluate_genomes(genomes, config, course, frame_skip=frame_skip, observations=observations,
+                               profiler=profiler, tick_budget=tick_budget)
+    return fitness, profiler.snapshot()
+
+
+def _evaluate_indexed_chunk(job):
+    index, genomes, config, course, frame_skip, observations, tick_budget = job
+    return (index,) + _evaluate_chunk(genomes, config, course, frame_skip, observations, tick_budget)
+
+
+class ParallelGameEvaluator:
+    """Fitness function for neat.Population.run that spreads a generation over a process pool.
+
+    Like neat.ParallelEvaluator, but genomes are sent in chunks so each worker
+    can still step its chunk as one DinoEnv. The scheduler (an
+    EvaluationScheduler) picks the courses and culls genomes in the parent
+    and every chunk of an episode runs on the same course, so the result
+    does not depend on num_workers or chunk_size.
+    """
+
+    def __init__(self, num_workers, scheduler=None, chunk_size=None, frame_skip=1, observations=None, profiler=None):
+        #profiler: profiling.Profiler that collects the workers' phase times and counts
+        self.num_workers = num_workers
+        self.scheduler = scheduler or EvaluationScheduler()
+        self.observations = observations
+        self.profiler = profiler
+        self.frame_skip = frame_skip
+        self.chunk_size = chunk_size
+        self.pool = Pool(processes=num_workers)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def chunks(self, genomes):
+        return chunk(genomes, self.num_workers, self.chunk_size)
+
+    def run_episode(self, genomes, config, course):
+        chunks = self.chunks(genomes)
+        jobs = [(index, part, config, course, self.frame_skip, self.observations, self.scheduler.tick_budget)
+                for index, part in enumerate(chunks)]
+
+        #take each chunk's results as soon as it finishes, whatever the order
+        results = [None] * len(chunks)
+        for index, chunk_fitness, profile in self.pool.imap_unordered(_evaluate_indexed_chunk, jobs):
+            results[index] = chunk_fitness
+            if self.profiler is not None:
+                self.profiler.merge(profile)
+        return [fitness for chunk_fitness in results for fitness in chunk_fitness]
+
+    def evaluate(self, genomes, config):
+        genomes = [genome for genome_id, genome in genomes]
+        fitnesses = self.scheduler.evaluate(
+            len(genomes), lambda indices, course: self.run_episode([genomes[i] for i in indices], config, course),
+            self.profiler)
+        for genome, fitness in zip(genomes, fitnesses):
+            genome.fitness = fitness
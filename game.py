@@ -1,182 +1,153 @@
+import argparse
 import os
-import pickle
 
-import neat
 import pygame
-import random
 
-from entities import Ground, Dino, Cactus, Bird
-from constants import WIDTH, HEIGHT, WHITE, BLACK
+from renderer import Renderer
+from env import DinoEnv
+from model import CompiledNetwork, MODEL_FILE
+from recording import EpisodeRecorder, Recording
+from course import Course
+from difficulty import PRESETS as DIFFICULTIES
+from simulation import NOTHING, JUMP, DUCK, output_to_action
+from constants import WIDTH, HEIGHT
 
 # Initialize Pygame
 pygame.init()
 
-FONT = pygame.font.Font(None, 36)
+
+def episode_path(path, episode):
+    """Where episode number `episode` of a --record PATH run is saved: run.rec -> run-001.rec."""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{episode:03d}{ext}"
 
 
 class Game:
     clock_speed = 60
 
-    def __init__(self):
+    def __init__(self, seed=None, course=None, record=None, replay=None, difficulty=None):
+        #seed/course: play a reproducible course, Course(seed) as in recording.py and tournament.py
+        #(a fixed course is replayed on every restart)
+        #difficulty: difficulty.Difficulty of the course made from seed
+        #record: save each episode (actions and states) when it ends, numbered (see episode_path)
+        #replay: play back this recording.Recording instead of taking input
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Chrome Dino Game")
 
-        # Load images
-        self.ground_img, self.dino_run_1_img, self.dino_run_2_img, self.dino_duck_1_img, self.dino_duck_2_img, self.dino_dead_img, self.cactus_images, self.bird_image_1, self.bird_image_2 = self.load_images()
-
-        self.ground = Ground(self.ground_img)
-        self.dino = Dino(self.dino_run_1_img, self.dino_run_2_img, self.dino_duck_1_img, self.dino_duck_2_img, self.dino_dead_img)
-
-        # Start with obstacles: Cacti and Bird
-        self.obstacles = []
-        previous_obstacle = None
-        for _ in range(3):
-            if random.random() <= 0.7:
-                cactus = Cactus(self.cactus_images, previous_obstacle, self.obstacles)
-                self.obstacles.append(cactus)
-                previous_obstacle = cactus
-            else:
-                bird = Bird([self.bird_image_1, self.bird_image_2], previous_obstacle, self.obstacles)
-                self.obstacles.append(bird)
-                previous_obstacle = bird
+        self.renderer = Renderer(self.screen)
+
+        self.neural_net = self.load_model(MODEL_FILE)
+
+        self.replay = replay
+        if replay:
+            course = replay.course()
+        elif course is None and seed is not None:
+            course = Course(seed, 3, difficulty)
+        self.course = course
+        #the env builds the inputs the model was trained on
+        observations = self.neural_net.observations if self.neural_net else None
+        self.env = DinoEnv(1, num_obstacles=3, courses=[course] if course is not None else None,
+                           observations=observations, difficulty=difficulty)
+        self.record = record
+        self.episode = 1
+        self.recorder = EpisodeRecorder(self.env, states=True) if record else None
+        self.frame = 0
+        #keyboard (or network) input for the next frame
+        self.jump_pressed = False
+        self.ducking = False
 
         self.score = 0
         self.game_active = True
         self.clock = pygame.time.Clock()
 
-        self.neural_net = self.load_best_genome("best_model.pkl")
-
-    def load_best_genome(self, genome_file):
-        """Load the best genome and create a neural network."""
-        with open(genome_file, 'rb') as f:
-            best_genome = pickle.load(f)
-
-        config_path = os.path.join(os.path.dirname(__file__), "config-feedforward.txt")
-        config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation, config_path)
-
-        # neural network from the loaded genome
-        neural_net = neat.nn.FeedForwardNetwork.create(best_genome, config)
-        return neural_net
-
-    def get_game_state(self, dino):
-        nearest_obstacle = None
-        for obstacle in self.obstacles:
-            if obstacle.rect.right > dino.rect.left:
-                nearest_obstacle = obstacle
-                break
-
-        if nearest_obstacle:
-            return (
-                dino.rect.bottom,  # Dino's Y position
-                nearest_obstacle.rect.left,  # Obstacle X position
-                nearest_obstacle.rect.bottom,  # Obstacle Y position
-                nearest_obstacle.rect.width,  # Obstacle width
-            )
-        return (dino.rect.bottom, WIDTH, HEIGHT, 0)  # No obstacle
-
-    def load_images(self):
-        ground_image = pygame.image.load("assets/ground.png").convert_alpha()
-        dino_run_1 = pygame.image.load("assets/dino_run1.png").convert_alpha()
-        dino_run_2 = pygame.image.load("assets/dino_run2.png").convert_alpha()
-        dino_duck_1 = pygame.image.load("assets/dino_duck1.png").convert_alpha()
-        dino_duck_2 = pygame.image.load("assets/dino_duck2.png").convert_alpha()
-        dino_dead = pygame.image.load("assets/dino_dead.png").convert_alpha()
-
-        cactus_images = [
-            pygame.image.load("assets/cactus_small.png").convert_alpha(),
-            pygame.image.load("assets/cactus_big.png").convert_alpha(),
-            pygame.image.load("assets/cactus_small_many.png").convert_alpha()
-        ]
-
-        bird_image_1 = pygame.image.load("assets/bird_1.png").convert_alpha()
-        bird_image_2 = pygame.image.load("assets/bird_2.png").convert_alpha()
-
-        return ground_image, dino_run_1, dino_run_2, dino_duck_1, dino_duck_2, dino_dead, cactus_images, bird_image_1, bird_image_2
-
+    def load_model(self, model_file):
+        """Load the network exported by ai_player.py (see model.py), or None if there is none."""
+        if not os.path.exists(model_file):
+            return None
+        return CompiledNetwork.load(model_file)
 
     def display_score(self):
-        score_text = pygame.font.Font(None, 36).render(f"Score: {int(self.score)}", True, BLACK)
-        self.screen.blit(score_text, (10, 10))
+        self.renderer.draw_text(f"Score: {int(self.score)}", (10, 10))
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.game_active = False
-            if self.dino.dead and event.type == pygame.KEYDOWN:
+            if self.finished() and event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     self.reset_game()
-            elif not self.dino.dead:
+            elif not self.finished():
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
-                        self.dino.jump()
+                        self.jump_pressed = True
                     if event.key == pygame.K_DOWN:
-                        self.dino.duck(True)
+                        self.ducking = True
                 if event.type == pygame.KEYUP:
                     if event.key == pygame.K_DOWN:
-                        self.dino.duck(False)
+                        self.ducking = False
 
 
     def handle_ai_events(self):
-        game_state = self.get_game_state(self.dino)
+        game_state = self.env.observation()[0]
 
         # Neural network processes the game state and outputs 3 values: jump, duck, do nothing
-        action = self.neural_net.activate(game_state)
-
-        if action[0] > 0.5:  # Jump
-            self.dino.jump()
-        elif action[1] > 0.5:  # Duck
-            self.dino.duck(True)
-        else:  # Do nothing or stop ducking
-            self.dino.duck(False)
+        action = output_to_action(self.neural_net.activate(game_state))
+        self.jump_pressed = action == JUMP
+        self.ducking = action == DUCK
 
         #quitting the game using the pygame event loop
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.game_active = False
 
-    def update(self):
-        if not self.dino.dead:
-            self.ground.move()
-            self.dino.move()
+    def action(self):
+        if self.replay:
+            return self.replay.actions[self.frame]
+        if self.jump_pressed:
+            return JUMP
+        return DUCK if self.ducking else NOTHING
 
-            for obstacle in self.obstacles:
-                obstacle.move()
-                if obstacle.collides_with(self.dino):
-                    self.dino.die()
+    def finished(self):
+        #a replay is over when its actions run out, even if the dino survived
+        return self.env.dead[0] or (self.replay is not None and self.frame >= len(self.replay))
 
-            self.score += 0.1
+    def update(self):
+        if not self.finished():
+            step = self.recorder.step if self.recorder else self.env.step
+            step([self.action()])
+            self.frame += 1
+            self.jump_pressed = False
+            self.score = self.env.score[0]
+            if self.env.dead[0]:
+                self.save_recording()
 
+    def save_recording(self):
+        if self.recorder and len(self.recorder.actions[0]):
+            player = "model" if self.neural_net else "human"
+            self.recorder.recording(info={"player": player}).save(episode_path(self.record, self.episode))
 
-    def draw(self):
-        self.screen.fill(WHITE)
-        self.ground.draw(self.screen)
-        self.dino.draw(self.screen)
 
-        for obstacle in self.obstacles:
-            obstacle.draw(self.screen)
+    def draw(self):
+        self.renderer.draw_env(self.env, [0])
 
         self.display_score()
-        if self.dino.dead:
+        if self.finished():
             self.display_game_over_message()
-        pygame.display.update()
+        self.renderer.present()
 
     def display_game_over_message(self):
-        game_over_text = pygame.font.Font(None, 48).render("Game Over! Press 'R' to Restart", True, BLACK)
-        self.screen.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 50))
+        message = "Replay finished" if self.replay else "Game Over! Press 'R' to Restart"
+        game_over_text = self.renderer.text.render(message, 48)
+        self.renderer.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 50))
 
     def reset_game(self):
-        self.dino = Dino(self.dino_run_1_img, self.dino_run_2_img, self.dino_duck_1_img, self.dino_duck_2_img, self.dino_dead_img)
-        self.obstacles = []
-        previous_obstacle = None
-        for _ in range(3):
-            if random.random() <= 0.7:
-                cactus = Cactus(self.cactus_images, previous_obstacle, obstacles=self.obstacles)
-                self.obstacles.append(cactus)
-                previous_obstacle = cactus
-            else:
-                bird = Bird([self.bird_image_1, self.bird_image_2], previous_obstacle, obstacles=self.obstacles)
-                self.obstacles.append(bird)
-                previous_obstacle = bird
+        self.env.reset(courses=[self.course] if self.course is not None else None)
+        if self.recorder:
+            self.recorder.reset()
+        self.episode += 1
+        self.frame = 0
+        self.jump_pressed = False
+        self.ducking = False
         self.score = 0
 
     def run(self):
@@ -188,11 +159,32 @@ class Game:
             self.update()
             self.draw()
             self.clock.tick(60)
+        #an episode quit before the dino died is saved too
+        if not self.env.dead[0]:
+            self.save_recording()
         pygame.quit()
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play the Chrome dino game.")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible obstacle course")
+    parser.add_argument("--course", default=None, metavar="PATH", help="play this saved course (see course.py)")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTIES), default="classic",
+                        help="classic: always the same speed, progressive/hard: speeds up with the score")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="save each episode when it ends, numbered: PATH run.rec gives run-001.rec, "
+                             "run-002.rec... (see recording.py)")
+    parser.add_argument("--replay", default=None, metavar="PATH", help="watch a recorded episode")
+    return parser.parse_args()
+
+
 # Main function
 def main():
-    game = Game()
+    args = parse_args()
+    course = Course.load(args.course) if args.course else None
+    replay = Recording.load(args.replay) if args.replay else None
+    game = Game(seed=args.seed, course=course, record=args.record, replay=replay,
+                difficulty=DIFFICULTIES[args.difficulty])
     game.run()
 
 if __name__ == "__main__":
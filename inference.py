@@ -0,0 +1,108 @@
+import neat
+import numpy as np
+
+from activations import ACTIVATIONS, ACTIVATION_NAMES
+
+#neat's scalar function -> index into ACTIVATION_NAMES
+_NEAT_ACTIVATION_IDS = {
+    getattr(neat.activations, name + "_activation"): i
+    for i, name in enumerate(ACTIVATION_NAMES)
+    if hasattr(neat.activations, name + "_activation")
+}
+
+
+class BatchNetwork:
+    """A generation of FeedForwardNetworks compiled into padded NumPy arrays.
+
+    Every network is flattened to its node evaluation order. Step k evaluates
+    the k-th node of every network at once, and the links of that node are
+    summed in the same order as FeedForwardNetwork.activate, so the outputs
+    match the per-genome networks.
+
+    Value columns: the inputs, then one column per evaluated node, then a zero
+    column used for padding links and for outputs that are never evaluated.
+    """
+
+    def __init__(self, nets):
+        self.num_networks = len(nets)
+        self.num_inputs = len(nets[0].input_nodes) if nets else 0
+        self.num_outputs = len(nets[0].output_nodes) if nets else 0
+        self.num_steps = max((len(net.node_evals) for net in nets), default=0)
+        self.zero_column = self.num_inputs + self.num_steps
+        self.num_columns = self.zero_column + 1
+
+        shape = (self.num_networks, self.num_steps)
+        self.activation = np.zeros(shape, dtype=np.int64)
+        self.bias = np.zeros(shape)
+        self.response = np.ones(shape)
+        max_links = max((len(links) for net in nets for *_, links in net.node_evals), default=0)
+        self.link_source = np.full(shape + (max_links,), self.zero_column, dtype=np.int64)
+        self.link_weight = np.zeros(shape + (max_links,))
+        self.output_columns = np.full((self.num_networks, self.num_outputs), self.zero_column, dtype=np.int64)
+
+        sum_aggregation = neat.aggregations.sum_aggregation
+        for g, net in enumerate(nets):
+            columns = {key: i for i, key in enumerate(net.input_nodes)}
+            for k, (node, act_func, agg_func, bias, response, links) in enumerate(net.node_evals):
+                if agg_func is not sum_aggregation:
+                    raise ValueError(f"BatchNetwork only supports sum aggregation (node {node})")
+                if act_func not in _NEAT_ACTIVATION_IDS:
+                    raise ValueError(f"BatchNetwork has no vectorized version of {act_func.__name__}")
+                self.activation[g, k] = _NEAT_ACTIVATION_IDS[act_func]
+                self.bias[g, k] = bias
+                self.response[g, k] = response
+                for j, (i, w) in enumerate(links):
+                    self.link_source[g, k, j] = columns[i]
+                    self.link_weight[g, k, j] = w
+                columns[node] = self.num_inputs + k
+
+            for o, key in enumerate(net.output_nodes):
+                self.output_columns[g, o] = columns.get(key, self.zero_column)
+
+        #per step: how many link slots are in use and which activations occur
+        self.step_links = [max((len(net.node_evals[k][5]) for net in nets if k < len(net.node_evals)), default=0)
+                           for k in range(self.num_steps)]
+        self.step_activations = [np.unique(self.activation[:, k]) for k in range(self.num_steps)]
+
+    @staticmethod
+    def create(genomes, config):
+        """Compile genomes the same way neat.nn.FeedForwardNetwork.create would."""
+        return BatchNetwork([neat.nn.FeedForwardNetwork.create(genome, config) for genome in genomes])
+
+    def activate(self, inputs, rows=None):
+        """Evaluate networks `rows` (default: all) on `inputs`, one row of inputs per network.
+
+        Returns an (len(rows), num_outputs) array.
+        """
+        if rows is None:
+            rows = np.arange(self.num_networks)
+        rows = np.asarray(rows, dtype=np.int64)
+        n = len(rows)
+
+        values = np.zeros((n, self.num_columns))
+        values[:, :self.num_inputs] = inputs
+        index = np.arange(n)
+
+        activation = self.activation[rows]
+        bias = self.bias[rows]
+        response = self.response[rows]
+        link_source = self.link_source[rows]
+        link_weight = self.link_weight[rows]
+
+        for k in range(self.num_steps):
+            s = np.zeros(n)
+            for j in range(self.step_links[k]):
+                s += values[index, link_source[:, k, j]] * link_weight[:, k, j]
+            z = bias[:, k] + response[:, k] * s
+
+            act_ids = self.step_activations[k]
+            if len(act_ids) == 1:
+                values[:, self.num_inputs + k] = ACTIVATIONS[ACTIVATION_NAMES[act_ids[0]]](z)
+            else:
+                column = np.empty(n)
+                for act_id in act_ids:
+                    mask = activation[:, k] == act_id
+                    column[mask] = ACTIVATIONS[ACTIVATION_NAMES[act_id]](z[mask])
+                values[:, self.num_inputs + k] = column
+
+        return values[index[:, None], self.output_columns[rows]]
@@ -0,0 +1,164 @@
+import argparse
+import json
+import mmap
+import os
+import pickle
+import struct
+
+import numpy as np
+
+from activations import ACTIVATIONS, ACTIVATION_NAMES
+from observations import ObservationBuilder, PRESETS
+
+#file layout: MAGIC, version and header size (uint32 each), the JSON header,
+#then the arrays it describes, each starting on an 8 byte boundary
+MAGIC = b"DINOMODL"
+MODEL_FORMAT_VERSION = 1
+MODEL_FILE = "best_model.dino"
+
+ARRAY_NAMES = ("activation", "bias", "response", "link_count", "link_source", "link_weight", "output_columns")
+
+
+def _aligned(offset):
+    return -(-offset // 8) * 8
+
+
+class CompiledNetwork:
+    """A trained feed-forward network as flat arrays, evaluated with NumPy only.
+
+    Same layout and evaluation order as inference.BatchNetwork for a single
+    network: node k is evaluated at step k from the value columns (inputs,
+    then evaluated nodes, then a zero column), so the outputs match
+    neat.nn.FeedForwardNetwork. Loading needs neither neat nor the config.
+    """
+
+    def __init__(self, arrays, num_inputs, observations=None):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.num_inputs = num_inputs
+        self.num_steps = len(self.activation)
+        self.num_outputs = len(self.output_columns)
+        self.observations = observations or ObservationBuilder()
+        self.functions = [ACTIVATIONS[ACTIVATION_NAMES[i]] for i in self.activation]
+
+    @staticmethod
+    def from_batch(networks, observations=None):
+        """Network 0 of an inference.BatchNetwork."""
+        arrays = {
+            "activation": networks.activation[0],
+            "bias": networks.bias[0],
+            "response": networks.response[0],
+            "link_count": np.array(networks.step_links, dtype=np.int64),
+            "link_source": networks.link_source[0],
+            "link_weight": networks.link_weight[0],
+            "output_columns": networks.output_columns[0],
+        }
+        return CompiledNetwork(arrays, networks.num_inputs, observations)
+
+    def activate(self, inputs):
+        """Outputs for one input vector, or for every row of a 2-D input array."""
+        inputs = np.asarray(inputs, dtype=np.float64)
+        single = inputs.ndim == 1
+        inputs = inputs.reshape(-1, self.num_inputs)
+
+        values = np.zeros((len(inputs), self.num_inputs + self.num_steps + 1))
+        values[:, :self.num_inputs] = inputs
+        for k in range(self.num_steps):
+            s = np.zeros(len(inputs))
+            for j in range(self.link_count[k]):
+                s += values[:, self.link_source[k, j]] * self.link_weight[k, j]
+            values[:, self.num_inputs + k] = self.functions[k](self.bias[k] + self.response[k] * s)
+
+        outputs = values[:, self.output_columns]
+        return outputs[0] if single else outputs
+
+    def to_bytes(self):
+        """The model file contents."""
+        header = {
+            "num_inputs": self.num_inputs,
+            "activation_names": ACTIVATION_NAMES,
+            "observations": self.observations.to_dict(),
+            "arrays": {},
+        }
+        #array offsets are relative to the end of the header, so its size does not matter
+        offset = 0
+        for name in ARRAY_NAMES:
+            array = np.ascontiguousarray(getattr(self, name))
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": array.shape, "offset": offset}
+            offset = _aligned(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode()
+
+        data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+        data = bytearray(data_start + offset)
+        data[:len(MAGIC) + 8 + len(header_bytes)] = (MAGIC + struct.pack("<II", MODEL_FORMAT_VERSION, len(header_bytes))
+                                                     + header_bytes)
+        for name in ARRAY_NAMES:
+            array_bytes = np.ascontiguousarray(getattr(self, name)).tobytes()
+            start = data_start + header["arrays"][name]["offset"]
+            data[start:start + len(array_bytes)] = array_bytes
+        return bytes(data)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def from_buffer(data, name="model"):
+        """A model from model file contents (bytes, mmap...); the arrays are read-only views of data."""
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{name}: not a model file")
+        version, header_size = struct.unpack_from("<II", data, len(MAGIC))
+        if version != MODEL_FORMAT_VERSION:
+            raise ValueError(f"{name}: unsupported model format version {version}")
+        header_start = len(MAGIC) + 8
+        header = json.loads(data[header_start:header_start + header_size])
+        if header["activation_names"] != ACTIVATION_NAMES:
+            raise ValueError(f"{name}: saved with different activation functions")
+
+        data_start = _aligned(header_start + header_size)
+        arrays = {}
+        for array_name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[array_name] = np.frombuffer(data, dtype, count, data_start + spec["offset"]).reshape(spec["shape"])
+        return CompiledNetwork(arrays, header["num_inputs"], ObservationBuilder.from_dict(header["observations"]))
+
+    @staticmethod
+    def load(path):
+        """Map a saved model into memory; the arrays are read-only views of the file."""
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return CompiledNetwork.from_buffer(data, path)
+
+
+def export_genome(genome, config, path, observations=None):
+    """Compile a trained genome and save it as a model file for game.py."""
+    from inference import BatchNetwork  #needs neat, which running a model does not
+
+    CompiledNetwork.from_batch(BatchNetwork.create([genome], config), observations).save(path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export a pickled genome (best_model.pkl) as a model file.")
+    parser.add_argument("genome", help="pickled neat genome")
+    parser.add_argument("path", nargs="?", default=MODEL_FILE, help=f"model file to write (default: {MODEL_FILE})")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), "config-feedforward.txt"))
+    parser.add_argument("--observation", choices=sorted(PRESETS), default="raw",
+                        help="observation preset the genome was trained with")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import neat
+
+    args = parse_args()
+    with open(args.genome, 'rb') as f:
+        genome = pickle.load(f)
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                neat.DefaultStagnation, args.config)
+    observations = PRESETS[args.observation]
+    observations.configure(config)
+    export_genome(genome, config, args.path, observations)
+    print(f"Model saved to '{args.path}'")
@@ -0,0 +1,115 @@
+import numpy as np
+
+from assets import DINO_SIZE
+from batch import DINO_X
+from constants import WIDTH, HEIGHT, SPEED, GROUND_HEIGHT, BIRD
+
+#name -> (values for every world of an env.DinoEnv, scale used when normalizing)
+DINO_FEATURES = {
+    "bottom": (lambda env: env.bottom, HEIGHT),
+    "velocity": (lambda env: env.velocity, 20),  #jump speed
+    "ducking": (lambda env: env.ducking, 1),
+    "speed": (lambda env: env.speed, SPEED),
+}
+
+
+def _time_to_impact(env, rows, slots):
+    #frames until the obstacle reaches the dino's front (0 once it has)
+    return np.maximum(env.obstacle_x[rows, slots] - (DINO_X + DINO_SIZE[0]), 0) / env.speed[rows]
+
+
+#name -> (values for one obstacle slot per world, scale used when normalizing, value when there is no obstacle)
+OBSTACLE_FEATURES = {
+    "left": (lambda env, rows, slots: env.obstacle_x[rows, slots], WIDTH, WIDTH),
+    "bottom": (lambda env, rows, slots: env.obstacle_y[rows, slots] + env.obstacle_height[rows, slots], HEIGHT, HEIGHT),
+    "width": (lambda env, rows, slots: env.obstacle_width[rows, slots], WIDTH, 0),
+    "height": (lambda env, rows, slots: env.obstacle_height[rows, slots], HEIGHT, 0),
+    "elevation": (lambda env, rows, slots: GROUND_HEIGHT - env.obstacle_y[rows, slots] - env.obstacle_height[rows, slots],
+                  HEIGHT, 0),
+    "bird": (lambda env, rows, slots: env.obstacle_type[rows, slots] == BIRD, 1, 0),
+    "duckable": (lambda env, rows, slots: env.duckable[rows, slots], 1, 0),
+    "time_to_impact": (_time_to_impact, WIDTH / SPEED, WIDTH / SPEED),
+}
+
+
+class ObservationBuilder:
+    """Turns env.DinoEnv state into network inputs, for every world at once.
+
+    The inputs are the dino_features, then obstacle_features for each of the
+    next `lookahead` obstacles ahead of the dino. With normalize, every value
+    is divided by its scale so inputs are roughly in [0, 1] (velocity in
+    [-1, 1]). The defaults are the 4 raw values of the original
+    get_game_state, which is what models trained so far expect.
+    """
+
+    def __init__(self, dino_features=("bottom",), obstacle_features=("left", "bottom", "width"),
+                 lookahead=1, normalize=False):
+        for name in dino_features:
+            if name not in DINO_FEATURES:
+                raise ValueError(f"unknown dino feature {name!r}, expected one of {sorted(DINO_FEATURES)}")
+        for name in obstacle_features:
+            if name not in OBSTACLE_FEATURES:
+                raise ValueError(f"unknown obstacle feature {name!r}, expected one of {sorted(OBSTACLE_FEATURES)}")
+        self.dino_features = tuple(dino_features)
+        self.obstacle_features = tuple(obstacle_features)
+        self.lookahead = lookahead
+        self.normalize = normalize
+
+    @property
+    def num_inputs(self):
+        return len(self.dino_features) + self.lookahead * len(self.obstacle_features)
+
+    def names(self):
+        """Column names, e.g. dino_bottom, obstacle1_left."""
+        names = [f"dino_{name}" for name in self.dino_features]
+        for j in range(self.lookahead):
+            names += [f"obstacle{j + 1}_{name}" for name in self.obstacle_features]
+        return names
+
+    def build(self, env):
+        """(num_worlds, num_inputs) observation array for env."""
+        observation = np.empty((env.num_worlds, self.num_inputs))
+        rows = np.arange(env.num_worlds)
+        column = 0
+        for name in self.dino_features:
+            values, scale = DINO_FEATURES[name]
+            observation[:, column] = values(env)
+            if self.normalize:
+                observation[:, column] /= scale
+            column += 1
+
+        for j in range(self.lookahead):
+            slots, present = env.ahead(j)
+            for name in self.obstacle_features:
+                values, scale, missing = OBSTACLE_FEATURES[name]
+                observation[:, column] = np.where(present, values(env, rows, slots), missing)
+                if self.normalize:
+                    observation[:, column] /= scale
+                column += 1
+        return observation
+
+    def configure(self, config):
+        """Set the genome input count of a neat.Config to match this builder."""
+        genome_config = config.genome_config
+        genome_config.num_inputs = self.num_inputs
+        genome_config.input_keys = [-i - 1 for i in range(self.num_inputs)]
+
+    def to_dict(self):
+        return {
+            "dino_features": list(self.dino_features),
+            "obstacle_features": list(self.obstacle_features),
+            "lookahead": self.lookahead,
+            "normalize": self.normalize,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+#named layouts for the command line
+PRESETS = {
+    "raw": ObservationBuilder(),
+    "rich": ObservationBuilder(dino_features=tuple(DINO_FEATURES), obstacle_features=tuple(OBSTACLE_FEATURES),
+                               lookahead=2, normalize=True),
+}
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from neat.population import CompleteExtinctionException
+
+
+def run_pipelined(population, fitness_function, n=None, prepare=None):
+    """neat.Population.run, but each new generation starts evaluating before it is speciated.
+
+    Evaluating a genome does not depend on its species, so as soon as the
+    next generation is reproduced its evaluation is started on a background
+    thread (which, with an evaluation.ParallelGameEvaluator, just waits on
+    the worker processes) while this thread sorts it into species. Speciation
+    uses no randomness and only reads the genomes, so the run is the same as
+    population.run(fitness_function, n) and reporters see the same calls in
+    the same order; evaluation just starts before start_generation.
+    prepare(), if given, is called on this thread for every generation
+    before its evaluation starts (e.g. evaluation.EvaluationScheduler.prepare),
+    so whatever it sets up cannot race with the reporters. It is also called
+    for a final generation that is never evaluated, so every end_generation
+    sees the same state: the next generation prepared, nothing more.
+    """
+    p = population
+    if p.config.no_fitness_termination and n is None:
+        raise RuntimeError("Cannot have no generational limit with no fitness termination")
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    evaluation = None
+    try:
+        k = 0
+        while n is None or k < n:
+            k += 1
+            if evaluation is None:
+                p.reporters.start_generation(p.generation)
+                if prepare is not None:
+                    prepare()
+                evaluation = executor.submit(fitness_function, list(p.population.items()), p.config)
+            evaluation.result()
+            evaluation = None
+
+            best = None
+            for g in p.population.values():
+                if best is None or g.fitness > best.fitness:
+                    best = g
+            p.reporters.post_evaluate(p.config, p.population, p.species, best)
+
+            if p.best_genome is None or best.fitness > p.best_genome.fitness:
+                p.best_genome = best
+
+            if not p.config.no_fitness_termination:
+                fv = p.fitness_criterion(g.fitness for g in p.population.values())
+                if fv >= p.config.fitness_threshold:
+                    p.reporters.found_solution(p.config, p.generation, best)
+                    break
+
+            p.population = p.reproduction.reproduce(p.config, p.species, p.config.pop_size, p.generation)
+
+            if not p.species.species:
+                p.reporters.complete_extinction()
+                if p.config.reset_on_extinction:
+                    p.population = p.reproduction.create_new(p.config.genome_type, p.config.genome_config,
+                                                             p.config.pop_size)
+                else:
+                    raise CompleteExtinctionException()
+
+            #the next generation plays while it is being speciated
+            if prepare is not None:
+                prepare()
+            if n is None or k < n:
+                evaluation = executor.submit(fitness_function, list(p.population.items()), p.config)
+            p.species.speciate(p.config, p.population, p.generation)
+
+            p.reporters.end_generation(p.config, p.population, p.species)
+
+            p.generation += 1
+            if evaluation is not None:
+                p.reporters.start_generation(p.generation)
+    finally:
+        #an error while speciating: let the evaluation in flight finish before the pool is closed
+        if evaluation is not None:
+            evaluation.cancel() or evaluation.exception()
+        executor.shutdown()
+
+    if p.config.no_fitness_termination:
+        p.reporters.found_solution(p.config, p.generation, p.best_genome)
+
+    return p.best_genome
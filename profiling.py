@@ -0,0 +1,111 @@
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+
+import neat
+
+#phases timed by evaluation.evaluate_genomes, in report order
+PHASES = ("physics", "activation", "bookkeeping", "render")
+COUNTERS = ("ticks", "dino_steps", "activations", "collision_checks", "culled")
+
+
+class Profiler:
+    """Accumulates time per phase and event counts, cheap enough for the per-frame loop.
+
+    Time a phase with `start = time.perf_counter()` ... `profiler.add(name, start)`;
+    add() returns the current time so consecutive phases can be chained.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, phase, start):
+        """Charge the time since start (a time.perf_counter() value) to phase."""
+        now = time.perf_counter()
+        self.seconds[phase] += now - start
+        return now
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def snapshot(self):
+        return {"seconds": dict(self.seconds), "counts": dict(self.counts)}
+
+    def merge(self, snapshot):
+        """Add a snapshot taken elsewhere (e.g. in a worker process)."""
+        for phase, seconds in snapshot["seconds"].items():
+            self.seconds[phase] += seconds
+        for name, n in snapshot["counts"].items():
+            self.counts[name] += n
+
+
+class ProfilingReporter(neat.reporting.BaseReporter):
+    """neat reporter for where evaluation time goes, one record per generation.
+
+    Prints a summary line when verbose and appends the record to log_path
+    (CSV, or JSON lines if the name ends in .jsonl), so throughput can be
+    compared between runs. With a process pool the phase times and ticks are
+    summed over all chunks, so they can add up to more than the wall time.
+    The record's wall time is the evaluation's own ("evaluate", from
+    evaluation.EvaluationScheduler) when there is one, else the time since
+    start_generation. The profiler is cleared after each record rather than
+    when a generation starts, because pipelined training (pipeline.py)
+    starts evaluating a generation before start_generation.
+    """
+
+    def __init__(self, profiler, log_path=None, verbose=True):
+        self.profiler = profiler
+        self.log_path = log_path
+        self.verbose = verbose
+        self.generation = None
+        self.start = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.start = time.perf_counter()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        elapsed = self.profiler.seconds.get("evaluate") or time.perf_counter() - self.start
+        record = self.record(len(population), elapsed)
+        self.profiler.reset()
+        if self.verbose:
+            print(self.summary(record))
+        if self.log_path:
+            self.write(record)
+
+    def record(self, num_genomes, elapsed):
+        seconds, counts = self.profiler.seconds, self.profiler.counts
+        record = {"generation": self.generation, "genomes": num_genomes, "seconds": round(elapsed, 6)}
+        for phase in PHASES:
+            record[f"{phase}_seconds"] = round(seconds[phase], 6)
+        for name in COUNTERS:
+            record[name] = counts[name]
+        elapsed = max(elapsed, 1e-9)
+        record["ticks_per_second"] = round(counts["ticks"] / elapsed, 2)
+        record["steps_per_second"] = round(counts["dino_steps"] / elapsed, 2)
+        record["genomes_per_second"] = round(num_genomes / elapsed, 2)
+        return record
+
+    def summary(self, record):
+        phases = ", ".join(f"{phase} {record[f'{phase}_seconds']:.3f}s" for phase in PHASES)
+        return (f"Profile: {record['seconds']:.3f}s ({phases}); {record['ticks']} ticks, "
+                f"{record['steps_per_second']:.0f} steps/s, {record['genomes_per_second']:.1f} genomes/s")
+
+    def write(self, record):
+        if self.log_path.endswith(".jsonl"):
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            return
+
+        new_file = not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0
+        with open(self.log_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(record))
+            if new_file:
+                writer.writeheader()
+            writer.writerow(record)
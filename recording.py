@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from course import Course
+from difficulty import Difficulty, PRESETS as DIFFICULTIES
+from env import DinoEnv
+
+#file layout: MAGIC, version and header size (uint32 each), the JSON header, then
+#the zlib-compressed data: one action byte per frame, then the states if recorded
+MAGIC = b"DINOREPL"
+#version 1 recordings have no course and replay the one generated from the seed
+RECORDING_FORMAT_VERSION = 2
+
+#per-frame state, taken after the frame's physics
+STATE_FIELDS = ("y", "velocity", "ducking", "score", "distance")
+#float32 states: anything closer than this is the same state
+STATE_TOLERANCE = 1e-3
+
+
+def env_states(env):
+    """STATE_FIELDS of every world of env as a (num_worlds, len(STATE_FIELDS)) array."""
+    return np.stack([env.y, env.velocity, env.ducking, env.score, env.distance], axis=1).astype(np.float32)
+
+
+class Recording:
+    """One episode: the course, the action of every frame and optionally the state after it.
+
+    The course and the actions are enough to play the episode again exactly,
+    without the network that chose the actions. course_data is the played
+    course's Course.to_dict() with the spawns the episode used, so a course
+    loaded from a file replays as it was played; without it the course is
+    generated from seed, num_obstacles and difficulty. score and dead are
+    the outcome when it was recorded; info is free-form JSON (who played,
+    generation...).
+    """
+
+    def __init__(self, seed, num_obstacles, actions, states=None, score=0.0, dead=False, info=None, difficulty=None,
+                 course_data=None):
+        self.seed = seed
+        self.num_obstacles = num_obstacles
+        self.difficulty = difficulty or Difficulty()
+        self.course_data = course_data
+        self.actions = np.asarray(actions, dtype=np.uint8)
+        self.states = None if states is None else np.asarray(states, dtype=np.float32)
+        self.score = score
+        self.dead = dead
+        self.info = info or {}
+
+    def __len__(self):
+        return len(self.actions)
+
+    def course(self):
+        if self.course_data is not None:
+            return Course.from_dict(self.course_data)
+        return Course(self.seed, self.num_obstacles, self.difficulty)
+
+    def make_env(self, observations=None):
+        """A fresh one-world DinoEnv at the start of the episode."""
+        return DinoEnv(1, self.num_obstacles, courses=[self.course()], observations=observations)
+
+    def play(self, env=None, on_frame=None):
+        """Step env (default: make_env()) through every recorded action and return it.
+
+        on_frame(env, frame) is called after each frame. The replay stops early
+        if the dino dies before the actions run out.
+        """
+        env = env or self.make_env()
+        for frame, action in enumerate(self.actions):
+            if not env.active[0]:
+                break
+            env.step([action])
+            if on_frame is not None:
+                on_frame(env, frame)
+        return env
+
+    def verify(self):
+        """Replay headless and compare with what was recorded; returns the differences (empty if none)."""
+        problems = []
+        states = []
+        env = self.play(on_frame=lambda env, frame: states.append(env_states(env)[0]))
+
+        if len(states) != len(self):
+            problems.append(f"episode ended after {len(states)} of {len(self)} frames")
+        if self.states is not None and states:
+            frames = min(len(states), len(self.states))
+            diverged = ~np.isclose(np.array(states[:frames]), self.states[:frames], atol=STATE_TOLERANCE)
+            if diverged.any():
+                frame, field = np.argwhere(diverged)[0]
+                problems.append(f"{STATE_FIELDS[field]} differs from frame {frame}: "
+                                f"{states[frame][field]:.3f} instead of {self.states[frame][field]:.3f}")
+        if bool(env.dead[0]) != self.dead:
+            problems.append(f"dino {'died' if env.dead[0] else 'survived'}, recorded {'dead' if self.dead else 'alive'}")
+        if abs(env.score[0] - self.score) > STATE_TOLERANCE:
+            problems.append(f"score {env.score[0]:.1f} instead of {self.score:.1f}")
+        return problems
+
+    def to_bytes(self):
+        header = {
+            "seed": self.seed,
+            "num_obstacles": self.num_obstacles,
+            "difficulty": self.difficulty.to_dict(),
+            "course": self.course_data,
+            "frames": len(self),
+            "state_fields": list(STATE_FIELDS) if self.states is not None else None,
+            "score": float(self.score),
+            "dead": bool(self.dead),
+            "info": self.info,
+        }
+        header_bytes = json.dumps(header).encode()
+        data = self.actions.tobytes()
+        if self.states is not None:
+            data += self.states.astype("<f4").tobytes()
+        return (MAGIC + struct.pack("<II", RECORDING_FORMAT_VERSION, len(header_bytes)) + header_bytes
+                + zlib.compress(data, 9))
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def from_bytes(data, name="recording"):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{name}: not a recording")
+        version, header_size = struct.unpack_from("<II", data, len(MAGIC))
+        if version not in (1, RECORDING_FORMAT_VERSION):
+            raise ValueError(f"{name}: unsupported recording format version {version}")
+        header_start = len(MAGIC) + 8
+        header = json.loads(data[header_start:header_start + header_size])
+        if header["state_fields"] not in (None, list(STATE_FIELDS)):
+            raise ValueError(f"{name}: recorded with different state fields")
+
+        payload = zlib.decompress(data[header_start + header_size:])
+        frames = header["frames"]
+        actions = np.frombuffer(payload, np.uint8, frames)
+        states = None
+        if header["state_fields"]:
+            states = np.frombuffer(payload, "<f4", offset=frames).reshape(frames, len(STATE_FIELDS))
+        return Recording(header["seed"], header["num_obstacles"], actions, states, header["score"], header["dead"],
+                         header["info"], Difficulty.from_dict(header["difficulty"]) if "difficulty" in header else None,
+                         header.get("course"))
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return Recording.from_bytes(f.read(), path)
+
+
+class EpisodeRecorder:
+    """Wraps a DinoEnv and records the actions (and states) of some of its worlds.
+
+    Use step() instead of env.step(); call reset() after env.reset(). Each
+    world's recording ends when the world is done. The env must step one
+    frame at a time (frame_skip 1), which is what replays do.
+    """
+
+    def __init__(self, env, worlds=None, states=False):
+        if env.frame_skip != 1:
+            raise ValueError("episodes can only be recorded from an env with frame_skip 1")
+        self.env = env
+        self.worlds = list(range(env.num_worlds)) if worlds is None else list(worlds)
+        self.record_states = states
+        self.reset()
+
+    def reset(self):
+        self.actions = {i: [] for i in self.worlds}
+        self.states = {i: [] for i in self.worlds}
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        stepping = [i for i in self.worlds if self.env.active[i]]
+        result = self.env.step(actions)
+        states = env_states(self.env) if self.record_states else None
+        for i in stepping:
+            self.actions[i].append(actions[i])
+            if states is not None:
+                self.states[i].append(states[i])
+        return result
+
+    def recording(self, i=None, info=None):
+        """The recording of world i (default: the first recorded world) so far."""
+        i = self.worlds[0] if i is None else i
+        states = None
+        if self.record_states:
+            states = np.array(self.states[i], dtype=np.float32).reshape(-1, len(STATE_FIELDS))
+        course = self.env.courses[i]
+        #only the spawns the episode reached; later ones are not needed to replay it
+        course_data = course.to_dict()
+        course_data["spawns"] = course_data["spawns"][:self.env.next_spawn[i]]
+        return Recording(course.seed, course.num_obstacles, self.actions[i], states, float(self.env.score[i]),
+                         bool(self.env.dead[i]), info, course.difficulty, course_data)
+
+
+def record_model(model, seed, num_obstacles=3, max_score=None, states=True, difficulty=None):
+    """Let a model.CompiledNetwork play the course with this seed and return the recording.
+
+    The network decides every frame, as in game.py; max_score stops a dino that never dies.
+    """
+    from simulation import output_to_action
+
+    env = DinoEnv(1, num_obstacles, courses=[Course(seed, num_obstacles, difficulty)], observations=model.observations)
+    recorder = EpisodeRecorder(env, states=states)
+    observation = env.observation()
+    while env.active[0] and (max_score is None or env.score[0] < max_score):
+        observation, rewards, dones, info = recorder.step([output_to_action(model.activate(observation[0]))])
+    return recorder.recording(info={"player": "model"})
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Record episodes and check that they still replay the same.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    verify = commands.add_parser("verify", help="replay recordings headless and report any difference")
+    verify.add_argument("recordings", nargs="+", metavar="PATH")
+
+    record = commands.add_parser("record", help="record a trained model playing a course")
+    record.add_argument("path", help="where to write the recording")
+    record.add_argument("--model", default="best_model.dino", help="model file (see model.py)")
+    record.add_argument("--seed", type=int, default=0, help="course seed")
+    record.add_argument("--obstacles", type=int, default=3,
+                        help="obstacles on screen at once (training uses 2, game.py uses 3)")
+    record.add_argument("--difficulty", choices=sorted(DIFFICULTIES), default="classic",
+                        help="speed and obstacle settings (see difficulty.py)")
+    record.add_argument("--max-score", type=float, default=1000, help="stop a dino that is still alive here")
+    record.add_argument("--no-states", action="store_true", help="only record the actions")
+
+    show = commands.add_parser("info", help="print what a recording holds")
+    show.add_argument("recordings", nargs="+", metavar="PATH")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.command == "record":
+        from model import CompiledNetwork
+
+        recording = record_model(CompiledNetwork.load(args.model), args.seed, args.obstacles, args.max_score,
+                                 states=not args.no_states, difficulty=DIFFICULTIES[args.difficulty])
+        recording.save(args.path)
+        print(f"{len(recording)} frames (score {recording.score:.1f}) saved to '{args.path}' "
+              f"({os.path.getsize(args.path)} bytes)")
+
+    elif args.command == "info":
+        for path in args.recordings:
+            recording = Recording.load(path)
+            print(f"{path}: course seed {recording.seed} ({recording.num_obstacles} obstacles), "
+                  f"{len(recording)} frames, score {recording.score:.1f}, {'dead' if recording.dead else 'alive'}, "
+                  f"states: {'yes' if recording.states is not None else 'no'}, info: {recording.info}")
+
+    else:
+        failed = False
+        for path in args.recordings:
+            problems = Recording.load(path).verify()
+            print(f"{path}: {'OK' if not problems else 'MISMATCH'}")
+            for problem in problems:
+                print(f"  {problem}")
+            failed |= bool(problems)
+        if failed:
+            raise SystemExit(1)
@@ -0,0 +1,152 @@
+from collections import OrderedDict
+
+import pygame
+
+from assets import asset_path, SPRITE_FILES, DINO_SPRITES, OBSTACLE_SPRITES, GROUND_SIZE
+from constants import WHITE, BLACK, GROUND_HEIGHT, OBSTACLE_TYPES
+
+
+def load_sprites():
+    """Load every sprite as a Surface. Needs an open display for convert_alpha."""
+    return {name: pygame.image.load(asset_path(name)).convert_alpha() for name in SPRITE_FILES}
+
+
+class TextCache:
+    """Fonts created once per size, and rendered text surfaces memoized by content.
+
+    A HUD line is only rendered again when its text changes; the least
+    recently used surfaces are dropped once there are more than max_surfaces.
+    """
+
+    def __init__(self, max_surfaces=256):
+        self.max_surfaces = max_surfaces
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+
+    def font(self, size):
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+
+    def render(self, text, size=36, color=BLACK):
+        key = (text, size, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.font(size).render(text, True, color)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_surfaces:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+
+class Renderer:
+    """Thin layer that maps simulation state from entities.py onto sprites.
+
+    Only the parts of the screen that change are redrawn and pushed to the
+    display: a frame starts with clear(), which paints the background over
+    whatever the previous frame drew, everything is drawn through blit(),
+    and present() updates just those rects (old and new). The ground and
+    the white sky behind it are pre-rendered into one opaque strip that is
+    scrolled with a single blit. invalidate() forces a full redraw.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.sprites = load_sprites()
+        self.text = TextCache()
+
+        #two ground images side by side on white, opaque so it needs no erasing
+        width, height = GROUND_SIZE
+        self.ground_strip = pygame.Surface((2 * width, height)).convert()
+        self.ground_strip.fill(WHITE)
+        self.ground_strip.blit(self.sprites["ground"], (0, 0))
+        self.ground_strip.blit(self.sprites["ground"], (width, 0))
+        self.ground_rect = pygame.Rect(0, GROUND_HEIGHT - height, screen.get_width(), height)
+
+        self.full_redraw = True
+        self.previous = []  #rects drawn in the last frame
+        self.drawn = []  #rects drawn in this frame
+        self.dirty = []  #rects erased in this frame
+
+    def invalidate(self):
+        """Redraw and update the whole screen next frame (e.g. after something else drew on it)."""
+        self.full_redraw = True
+
+    def clear(self):
+        """Start a frame by erasing what the previous frame drew."""
+        if self.full_redraw:
+            self.screen.fill(WHITE)
+        else:
+            for rect in self.previous:
+                self.screen.fill(WHITE, rect)
+        self.dirty = list(self.previous)
+        self.drawn = []
+
+    def blit(self, surface, topleft):
+        self.drawn.append(self.screen.blit(surface, topleft))
+
+    def present(self):
+        """Push this frame's changes to the display."""
+        if self.full_redraw:
+            pygame.display.update()
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.dirty + self.drawn)
+        self.previous = self.drawn
+
+    def draw_text(self, text, topleft, size=36):
+        surface = self.text.render(text, size)
+        self.blit(surface, topleft)
+        return surface
+
+    def draw_ground_at(self, x):
+        """The ground with one image starting at screen x (and the next one a ground width later)."""
+        #the strip is redrawn every frame and never erased, so it is dirty but not in self.drawn
+        area = pygame.Rect(-x, 0, self.ground_rect.width, self.ground_rect.height)
+        self.screen.blit(self.ground_strip, self.ground_rect.topleft, area)
+        self.dirty.append(self.ground_rect)
+
+    def draw_ground(self, ground):
+        self.draw_ground_at(min(ground.rect1.left, ground.rect2.left))
+
+    def draw_dino_sprite(self, pose, frame, topleft):
+        self.blit(self.sprites[DINO_SPRITES[(pose, frame)]], topleft)
+
+    def draw_dino(self, dino):
+        self.draw_dino_sprite(dino.pose(), dino.frame(), dino.rect.topleft)
+
+    def draw_obstacle_sprite(self, obstacle_type, variant, topleft):
+        self.blit(self.sprites[OBSTACLE_SPRITES[obstacle_type][variant]], topleft)
+
+    def draw_obstacle(self, obstacle):
+        self.draw_obstacle_sprite(obstacle.obstacle_type, obstacle.variant, obstacle.rect.topleft)
+
+    def draw_world(self, ground, obstacles, dinos):
+        """Start a frame with a World's ground, dinos and obstacles; finish it with present()."""
+        self.clear()
+        self.draw_ground(ground)
+        for dino in dinos:
+            self.draw_dino(dino)
+
+        for obstacle in obstacles:
+            self.draw_obstacle(obstacle)
+
+    def draw_env(self, env, indices):
+        """draw_world for an env.DinoEnv: the ground and obstacles of world indices[0]
+        (world 0 if indices is empty) and the dinos of every world in indices.
+        Only meaningful for several worlds when they play the same course."""
+        world = indices[0] if len(indices) else 0
+        self.clear()
+
+        #the two ground images wrap every ground width (see Ground.move)
+        width = GROUND_SIZE[0]
+        self.draw_ground_at(-((int(env.distance[world]) + width // 2) % width))
+
+        for i in indices:
+            self.draw_dino_sprite(env.pose(i), env.frame(i), env.topleft(i))
+
+        for k in range(env.num_obstacles):
+            topleft = int(env.obstacle_x[world, k]), int(env.obstacle_y[world, k])
+            self.draw_obstacle_sprite(OBSTACLE_TYPES[env.obstacle_type[world, k]], env.variant[world, k], topleft)
@@ -0,0 +1,157 @@
+from numbers import Integral
+
+from assets import GROUND_SIZE, DINO_SIZE, CACTUS_SIZES, BIRD_SIZES
+from collision import MAX_DINO_WIDTH
+from course import Course
+from entities import Ground, Dino, Cactus, Bird
+
+#actions a player (or network) can take each decision
+NOTHING, JUMP, DUCK = 0, 1, 2
+
+
+def output_to_action(output):
+    """Network outputs (jump, duck, nothing) -> action, using the usual 0.5 thresholds."""
+    if output[0] > 0.5:  # Jump
+        return JUMP
+    elif output[1] > 0.5:  # Duck
+        return DUCK
+    return NOTHING  #do nothing
+
+
+class ObstacleQueue:
+    """The obstacles on screen, as a ring buffer kept in x order.
+
+    A course places every spawn to the right of all earlier ones, so the
+    oldest obstacle is always the leftmost (and the next to leave the screen)
+    and the newest is the rightmost. Replacing the leftmost with a new spawn
+    just moves `head` on, and the slots read from head onwards stay sorted.
+    """
+
+    def __init__(self, obstacles):
+        self.slots = list(obstacles)
+        self.head = 0  #slot of the leftmost obstacle
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, j):
+        """The j-th obstacle from the left."""
+        return self.slots[(self.head + j) % len(self.slots)]
+
+    def __iter__(self):
+        for j in range(len(self.slots)):
+            yield self[j]
+
+    def leftmost(self):
+        return self.slots[self.head]
+
+    def replace_leftmost(self, obstacle):
+        """Put a new (rightmost) obstacle in place of the leftmost one."""
+        self.slots[self.head] = obstacle
+        self.head = (self.head + 1) % len(self.slots)
+
+
+class World:
+    """Pure game state (ground, obstacles, dinos) that can be stepped without pygame."""
+
+    def __init__(self, num_obstacles=3, seed=None, course=None):
+        self.num_obstacles = num_obstacles
+        self.reset(seed, course)
+
+    def reset(self, seed=None, course=None):
+        """Start over on `course`, or on a new course generated from `seed` (random if None)."""
+        if course is None:
+            course = Course(seed, self.num_obstacles)
+        self.course = course
+        self.num_obstacles = course.num_obstacles
+
+        self.ground = Ground(GROUND_SIZE)
+        self.dinos = []
+        self.score = 0
+        #pixels scrolled per frame, set by the course's difficulty from the score
+        self.speed = course.difficulty.speed(self.score)
+        #how far the world has scrolled: course x = screen x + distance
+        self.distance = 0
+        self.next_spawn = 0
+
+        # Start with obstacles: Cacti and Bird
+        self.obstacles = ObstacleQueue(self.spawn_obstacle() for _ in range(self.num_obstacles))
+
+    def spawn_obstacle(self):
+        spawn = self.course[self.next_spawn]
+        self.next_spawn += 1
+        x = spawn.x - self.distance
+        if spawn.obstacle_type == "bird":
+            return Bird(BIRD_SIZES, spawn.variant, x, spawn.height)
+        return Cactus(CACTUS_SIZES, spawn.variant, x)
+
+    def move_obstacles(self):
+        """Scroll every obstacle, replacing the ones that left the screen with the next spawn."""
+        self.distance += self.speed
+        for obstacle in self.obstacles.slots:
+            obstacle.move(self.speed)
+        #only the leftmost obstacle can have left the screen
+        while self.obstacles.leftmost().off_screen():
+            self.obstacles.replace_leftmost(self.spawn_obstacle())
+
+    def add_dino(self):
+        dino = Dino(DINO_SIZE)
+        self.dinos.append(dino)
+        return dino
+
+    def apply_action(self, dino, action):
+        if action == JUMP:
+            dino.jump()
+        elif action == DUCK:
+            dino.duck(True)
+        else:
+            dino.duck(False)
+
+    def step(self, actions, n_frames=1):
+        """Hold each dino's action for n_frames physics frames, without sleeping or polling events.
+
+        actions is one action per dino in self.dinos, or a single action for all of
+        them. The physics are exactly those of calling update() n_frames times.
+        Returns the number of frames advanced (fewer if every dino died).
+        """
+        if isinstance(actions, Integral):  #also NumPy integers, as DinoEnv takes
+            actions = [actions] * len(self.dinos)
+        for frame in range(n_frames):
+            if all(dino.dead for dino in self.dinos):
+                return frame
+            for dino, action in zip(self.dinos, actions):
+                if not dino.dead:
+                    self.apply_action(dino, action)
+            self.update()
+        return n_frames
+
+    def update(self):
+        """Advance one frame. The world stands still once every dino is dead."""
+        alive = [dino for dino in self.dinos if not dino.dead]
+        if not alive:
+            return
+
+        self.speed = self.course.difficulty.speed(self.score)
+        self.ground.move(self.speed)
+        for dino in alive:
+            dino.move()
+
+        self.move_obstacles()
+        #broad phase: every dino runs at the same x, and obstacles are in x order,
+        #so only the ones overlapping the dinos' x-band are tested
+        masks = self.course.difficulty.hitboxes == "mask"
+        left = alive[0].rect.left
+        right = left + (MAX_DINO_WIDTH if masks else alive[0].rect.width)
+        for obstacle in self.obstacles:
+            if obstacle.rect.left >= right:
+                break
+            if obstacle.rect.right <= left:
+                continue
+            for dino in alive:
+                if obstacle.collides_with(dino, masks):
+                    dino.die()
+
+        for dino in alive:
+            dino.increment_score()
+            dino.animate()
+        self.score += 0.1
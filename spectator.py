@@ -0,0 +1,137 @@
+import multiprocessing
+import queue
+
+import neat
+import pygame
+
+from constants import WIDTH, HEIGHT
+from course import Course
+from env import DinoEnv
+from inference import BatchNetwork
+from model import CompiledNetwork
+from evaluation import SCORE_LIMIT
+from simulation import NOTHING, output_to_action
+
+
+class SpectatorReporter(neat.reporting.BaseReporter):
+    """neat reporter that sends each generation's best genome to a viewer process.
+
+    The message is everything needed to replay that genome exactly: its
+    compiled network (model file bytes), the course it was evaluated on and
+    the frame skip and tick budget. Sending never waits: if the viewer is
+    behind, the replay is dropped, and if the viewer was closed nothing is
+    sent at all.
+    course_source() returns the course of the generation just evaluated.
+    """
+
+    def __init__(self, course_source, observations, frame_skip=1, tick_budget=None):
+        self.course_source = course_source
+        self.observations = observations
+        self.frame_skip = frame_skip
+        self.tick_budget = tick_budget
+        self.generation = None
+
+        #spawn, not fork: the trainer has already initialized pygame/SDL
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue(maxsize=2)
+        self.process = context.Process(target=run_viewer, args=(self.queue,), daemon=True)
+        self.process.start()
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        if not self.process.is_alive():
+            return
+        network = CompiledNetwork.from_batch(BatchNetwork.create([best_genome], config), self.observations)
+        replay = {
+            "generation": self.generation,
+            "fitness": best_genome.fitness,
+            "model": network.to_bytes(),
+            "course": self.course_source().to_dict(),
+            "frame_skip": self.frame_skip,
+            "tick_budget": self.tick_budget,
+        }
+        try:
+            self.queue.put_nowait(replay)
+        except queue.Full:
+            pass
+
+    def close(self):
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class Replay:
+    """One genome playing its course again, frame by frame, exactly as in evaluation."""
+
+    def __init__(self, message):
+        self.generation = message["generation"]
+        self.fitness = message["fitness"]
+        self.frame_skip = message["frame_skip"]
+        self.tick_budget = message["tick_budget"]
+        self.network = CompiledNetwork.from_buffer(message["model"])
+        course = Course.from_dict(message["course"])
+        self.env = DinoEnv(1, course.num_obstacles, courses=[course], observations=self.network.observations)
+        self.action = NOTHING
+        self.frame = 0
+
+    def finished(self):
+        #where evaluation stops a dino that survives
+        return (self.env.dead[0] or self.env.score[0] >= SCORE_LIMIT
+                or (self.tick_budget and self.frame >= self.tick_budget))
+
+    def step(self):
+        observation, rewards, dones, info = self.env.step([self.action])
+        if self.frame % self.frame_skip == 0:
+            self.action = output_to_action(self.network.activate(observation[0]))
+        self.frame += 1
+
+
+def run_viewer(replays, fps=60):
+    """Viewer process: play the newest replay from the replays queue at fps, looping it until a newer one arrives."""
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Chrome Dino Game - best genome")
+    from renderer import Renderer  #sprites need the display
+    renderer = Renderer(screen)
+    clock = pygame.time.Clock()
+
+    message = None
+    replay = None
+    pause = 0  #frames to hold the last frame of a finished replay
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+
+        #always jump to the newest replay
+        try:
+            while True:
+                message = replays.get_nowait()
+                replay = None
+        except queue.Empty:
+            pass
+
+        if message is not None and replay is None:
+            replay = Replay(message)
+            renderer.invalidate()
+
+        if replay is None:
+            renderer.clear()
+            renderer.draw_text("Waiting for the first generation...", (10, 10))
+        else:
+            if not replay.finished():
+                replay.step()
+            elif pause < fps:
+                pause += 1
+            else:
+                pause = 0
+                replay = Replay(message)
+
+            renderer.draw_env(replay.env, [0])
+            renderer.draw_text(f"Generation {replay.generation} best (fitness {replay.fitness:.2f})", (10, 10))
+            renderer.draw_text(f"Score: {int(replay.env.score[0])}", (10, 50))
+        renderer.present()
+        clock.tick(fps)
@@ -0,0 +1,65 @@
+import gzip
+import os
+import pickle
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+
+import ai_player
+from checkpoints import checkpoint_path
+
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config-feedforward.txt")
+GENERATIONS = 6
+
+
+def small_config(directory):
+    with open(CONFIG) as f:
+        text = f.read().replace("pop_size              = 200", "pop_size              = 30")
+    path = os.path.join(directory, "config.txt")
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def train(directory, pipeline, resume=None):
+    """Train in directory and return the winner and the extra state of its generation 4 checkpoint."""
+    os.chdir(directory)
+    random.seed(0)
+    game = ai_player.Game(headless=True, seed=5, episodes=2, top_k=10, tick_budget=600, pipeline=pipeline)
+    game.run_neat(small_config(directory), generations=GENERATIONS, resume=resume, checkpoint_dir="checkpoints",
+                  checkpoint_every=2, keep_checkpoints=GENERATIONS)
+    with open("best_model.pkl", 'rb') as f:
+        winner = pickle.load(f)
+    extra = None
+    if resume is None:
+        with open(checkpoint_path("checkpoints", 4), 'rb') as f:
+            extra = pickle.loads(gzip.decompress(f.read()))["extra"]
+    return winner, extra
+
+
+def test_resumed_pipelined_run_matches_population_run(tmp_path, monkeypatch):
+    serial, pipelined = tmp_path / "serial", tmp_path / "pipelined"
+    serial.mkdir()
+    pipelined.mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    winner, extra = train(str(serial), pipeline=False)
+
+    #slow speciation down so every background evaluation finishes before end_generation
+    speciate = neat.DefaultSpeciesSet.speciate
+
+    def slow_speciate(self, *args):
+        time.sleep(0.3)
+        return speciate(self, *args)
+
+    monkeypatch.setattr(neat.DefaultSpeciesSet, "speciate", slow_speciate)
+    pipelined_winner, pipelined_extra = train(str(pipelined), pipeline=True)
+    assert pipelined_extra["generation"] == extra["generation"] == 4
+    assert pipelined_extra["scheduler"] == extra["scheduler"]
+    assert (pipelined_winner.key, pipelined_winner.fitness) == (winner.key, winner.fitness)
+
+    resumed_winner, _ = train(str(pipelined), pipeline=True, resume=checkpoint_path("checkpoints", 4))
+    assert (resumed_winner.key, resumed_winner.fitness) == (winner.key, winner.fitness)
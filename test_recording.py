@@ -0,0 +1,31 @@
+import random
+
+from course import Course
+from env import DinoEnv
+from recording import EpisodeRecorder, Recording
+
+
+def record_random_episode(course, seed, num_obstacles=3):
+    env = DinoEnv(1, num_obstacles=num_obstacles, courses=[course])
+    recorder = EpisodeRecorder(env, states=True)
+    rng = random.Random(seed)
+    while env.active[0] and env.score[0] < 150:
+        recorder.step([rng.choice([0, 0, 0, 0, 1, 2])])
+    return Recording.from_bytes(recorder.recording().to_bytes())
+
+
+def test_env_takes_num_obstacles_from_its_courses():
+    env = DinoEnv(1, num_obstacles=3, courses=[Course(0, 2)])
+    assert env.num_obstacles == 2
+    assert env.boxes.shape == (1, 2, 4)
+
+
+def test_recorded_file_course_replays_as_played():
+    for seed in range(6):
+        data = Course(seed, 2).precompute(200).to_dict()
+        #spawns that generating from the seed would not give, as from older course rules
+        data["spawns"] = [[kind, variant, x + 37 * (j % 3), height]
+                          for j, (kind, variant, x, height) in enumerate(data["spawns"])]
+        recording = record_random_episode(Course.from_dict(data), seed)
+        assert recording.num_obstacles == 2
+        assert recording.verify() == []
@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import pickle
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+import numpy as np
+
+from batch import outputs_to_actions
+from constants import BIRD_HEIGHTS
+from course import Course
+from difficulty import PRESETS as DIFFICULTIES
+from env import DinoEnv
+from evaluation import chunk
+from model import CompiledNetwork
+from observations import PRESETS
+
+PERCENTILES = (5, 25, 50, 75, 95)
+#what ends an episode: an obstacle, or reaching max_score
+OUTCOMES = ("cactus",) + tuple(f"bird {level}" for level in BIRD_HEIGHTS.values()) + ("survived",)
+
+
+def load_model(path, config_path=None, observation="raw"):
+    """A model.CompiledNetwork from a model file, or from a pickled genome (best_model.pkl) and its config."""
+    if not path.endswith(".pkl"):
+        return CompiledNetwork.load(path)
+
+    import neat
+    from inference import BatchNetwork
+
+    with open(path, 'rb') as f:
+        genome = pickle.load(f)
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                neat.DefaultStagnation, config_path)
+    observations = PRESETS[observation]
+    observations.configure(config)
+    return CompiledNetwork.from_batch(BatchNetwork.create([genome], config), observations)
+
+
+def play_courses(model, seeds, num_obstacles=3, difficulty=None, max_score=500):
+    """Let model play one course per seed, all at once as the worlds of one DinoEnv.
+
+    The network decides every frame, as in game.py. Returns each course's
+    final score and outcome (see OUTCOMES) and the number of frames played.
+    """
+    courses = [Course(seed, num_obstacles, difficulty) for seed in seeds]
+    env = DinoEnv(len(courses), num_obstacles, courses=courses, observations=model.observations)
+    frames = 0
+    while env.active.any():
+        playing = np.flatnonzero(env.active)
+        actions = np.zeros(env.num_worlds, dtype=np.int8)
+        actions[playing] = outputs_to_actions(model.activate(env.observation()[playing]))
+        env.advance(actions)
+        frames += len(playing)
+        env.remove(env.score >= max_score)
+
+    outcomes = [env.death_cause(i) or "survived" for i in range(env.num_worlds)]
+    return env.score.tolist(), outcomes, frames
+
+
+def _play_chunk(model_bytes, seeds, num_obstacles, difficulty, max_score):
+    return play_courses(CompiledNetwork.from_buffer(model_bytes), seeds, num_obstacles, difficulty, max_score)
+
+
+def summarize(scores, outcomes, frames, seconds):
+    scores = np.array(scores)
+    summary = {
+        "courses": len(scores),
+        "mean": float(scores.mean()),
+        "std": float(scores.std()),
+        "min": float(scores.min()),
+        "max": float(scores.max()),
+    }
+    for q, value in zip(PERCENTILES, np.percentile(scores, PERCENTILES)):
+        summary[f"p{q}"] = float(value)
+    counts = Counter(outcomes)
+    summary["outcomes"] = {outcome: counts[outcome] for outcome in OUTCOMES}
+    summary["frames"] = frames
+    summary["seconds"] = round(seconds, 6)
+    summary["frames_per_second"] = round(frames / max(seconds, 1e-9), 2)
+    summary["courses_per_second"] = round(len(scores) / max(seconds, 1e-9), 2)
+    return summary
+
+
+def run_tournament(models, num_courses=200, seed=0, num_obstacles=3, difficulty=None, max_score=500, workers=1,
+                   chunk_size=None):
+    """Play every model on the same num_courses seeded courses and return {name: summary}.
+
+    models maps a name to a model.CompiledNetwork. Courses are split into
+    chunks over a pool of workers processes (none if workers is 1).
+    """
+    chunks = chunk([seed + i for i in range(num_courses)], workers, chunk_size)
+    pool = Pool(processes=workers) if workers > 1 else None
+
+    results = {}
+    try:
+        for name, model in models.items():
+            start = time.perf_counter()
+            args = [(model.to_bytes(), seeds, num_obstacles, difficulty, max_score) for seeds in chunks]
+            parts = pool.starmap(_play_chunk, args) if pool else [_play_chunk(*arg) for arg in args]
+            scores = [score for part in parts for score in part[0]]
+            outcomes = [outcome for part in parts for outcome in part[1]]
+            frames = sum(part[2] for part in parts)
+            results[name] = summarize(scores, outcomes, frames, time.perf_counter() - start)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return results
+
+
+def format_results(results):
+    lines = []
+    header = (f"{'model':<24}{'mean':>8}{'std':>8}" + "".join(f"{f'p{q}':>8}" for q in PERCENTILES)
+              + "".join(f"{outcome:>11}" for outcome in OUTCOMES) + f"{'courses/s':>11}")
+    lines.append(header)
+    for name, summary in results.items():
+        lines.append(f"{name[-24:]:<24}{summary['mean']:>8.1f}{summary['std']:>8.1f}"
+                     + "".join(f"{summary[f'p{q}']:>8.1f}" for q in PERCENTILES)
+                     + "".join(f"{summary['outcomes'][outcome]:>11}" for outcome in OUTCOMES)
+                     + f"{summary['courses_per_second']:>11.1f}")
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play trained models headless on many seeded courses and "
+                                                 "compare their scores and causes of death.")
+    parser.add_argument("models", nargs="+", metavar="MODEL",
+                        help="model files (best_model.dino) or pickled genomes (best_model.pkl)")
+    parser.add_argument("--courses", type=int, default=200, help="number of courses (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="course i is seeded with seed + i (default: 0)")
+    parser.add_argument("--obstacles", type=int, default=3,
+                        help="obstacles on screen at once (training uses 2, game.py uses 3)")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTIES), default="classic",
+                        help="speed and obstacle settings (see difficulty.py)")
+    parser.add_argument("--max-score", type=float, default=500, help="a dino still alive here survived the course")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes (default: one per CPU)")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), "config-feedforward.txt"),
+                        help="NEAT config for pickled genomes")
+    parser.add_argument("--observation", choices=sorted(PRESETS), default="raw",
+                        help="observation preset pickled genomes were trained with")
+    parser.add_argument("--output", default=None, metavar="PATH", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    models = {path: load_model(path, args.config, args.observation) for path in args.models}
+    results = run_tournament(models, args.courses, args.seed, args.obstacles, DIFFICULTIES[args.difficulty],
+                             args.max_score, args.workers)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                "courses": args.courses,
+                "seed": args.seed,
+                "obstacles": args.obstacles,
+                "difficulty": args.difficulty,
+                "max_score": args.max_score,
+                "results": results,
+            }, f, indent=2)